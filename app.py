@@ -1,12 +1,21 @@
 import streamlit as st
+import logging
 import os
 import shutil # For directory cleanup
+import hashlib
+import threading
+import uuid
+from src.artifact_cache import artifact_key, get_cached_file, cache_file, get_cached_value, cache_value
 from src.utils import language_mapping, is_valid_youtube_link # Import the new utility function
-from src.video_processing import download_youtube_video, resize_video, extract_audio
-from src.transcription import transcribe_audio
-from src.translation import translate_text
+from src.video_processing import get_youtube_video_info, estimate_download_size, download_youtube_video, resize_and_extract, SPEAKER_REFERENCE_SAMPLE_RATE
+from src.transcription import transcribe_audio, release_whisper_models
+from src.translation import TranslationError, translate_text
 from src.speech_synthesis import synthesize_speech, release_tts_models
-from src.lip_sync import run_wav2lip, run_video_retalking, get_wav2lip_readme_instructions, get_video_retalking_readme_instructions
+from src.lip_sync import run_wav2lip, run_video_retalking, release_lip_sync_models, get_wav2lip_readme_instructions, get_video_retalking_readme_instructions
+from src.lip_sync import WAV2LIP_READY, VIDEO_RETALKING_READY
+
+# Pipeline modules report progress through the logging module; show it on the console like before.
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 st.set_page_config(layout="wide")
 st.title("AI Lip Sync Tool 👄")
@@ -24,19 +33,43 @@ if st.sidebar.button("Clear Input", key="clear_input"):
     st.experimental_rerun()
 
 
-target_language_name = st.sidebar.selectbox("2. Select target language", options=list(language_mapping.keys()))
+target_lang_code = st.sidebar.selectbox(
+    "2. Select target language",
+    options=list(language_mapping.keys()),
+    format_func=lambda code: language_mapping[code].capitalize(),
+)
 
 whisper_model_options = ["tiny", "base", "small", "medium", "large"]
 whisper_model_size = st.sidebar.selectbox(
     "Select Whisper Model Size", 
     options=whisper_model_options, 
     index=whisper_model_options.index("medium"), # Default to medium
-    help="Smaller models are faster but less accurate. Larger models are more accurate but slower and use more memory. Ensure you have downloaded the corresponding .pt file."
+    help="Smaller models are faster but less accurate. Larger models are more accurate but slower and use more memory. The model is downloaded to models/whisper/ on first use."
 )
 
+with st.sidebar.expander("Advanced", expanded=False):
+    whisper_compute_type = st.selectbox(
+        "Whisper compute type",
+        options=["auto", "int8", "int8_float16", "float16", "float32"],
+        index=0,
+        help="Numeric precision used by faster-whisper. 'auto' uses int8 on CPU and int8_float16 on GPU."
+    )
+
 quality = st.sidebar.radio("Select lip-sync quality", options=["Normal (Wav2Lip)", "High Quality (Video Retalking)"])
+# Lip-sync model setup, checked when the app starts (see "Setup & Instructions" below; restart the app after installing a model).
+st.sidebar.markdown(
+    f"{'🟢' if WAV2LIP_READY else '🔴'} Wav2Lip &nbsp;&nbsp; {'🟢' if VIDEO_RETALKING_READY else '🔴'} Video-Retalking"
+)
 resize_720p = st.sidebar.checkbox("Resize video to 720p (recommended for better results)", True)
 
+# Models stay loaded between runs so that repeated processing does not pay the load time again.
+if st.sidebar.button("Free model memory", help="Unload cached models (Whisper, TTS, Wav2Lip) and release GPU memory. They are reloaded on the next run."):
+    with st.spinner("Releasing models from memory..."):
+        release_whisper_models()
+        release_tts_models()
+        release_lip_sync_models()
+    st.sidebar.info("Models released from memory.")
+
 if st.sidebar.button("Start Processing"):
     # Clear previous run's output on the main page
     main_placeholder = st.empty() # Create a placeholder for all dynamic content
@@ -47,144 +80,214 @@ if st.sidebar.button("Start Processing"):
         # Create temp directory
         temp_dir = "temp_processing_space"
         os.makedirs(temp_dir, exist_ok=True)
-        
-        source_video_path = None
-        current_video_path = None # To track the video path through processing steps
-
-        if uploaded_file:
-            source_video_path = os.path.join(temp_dir, uploaded_file.name)
-            with open(source_video_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.info(f"Uploaded {uploaded_file.name}")
-            current_video_path = source_video_path
-        elif youtube_link:
-            with st.spinner("Downloading YouTube video..."):
+
+        try:
+            source_video_path = None
+            current_video_path = None # To track the video path through processing steps
+
+            if uploaded_file:
+                source_video_path = os.path.join(temp_dir, uploaded_file.name)
+                # getbuffer() is a zero-copy view of the upload; writing it directly avoids a second
+                # video-sized bytes object (getvalue()/read() would copy). The view is released right after.
+                with open(source_video_path, "wb") as f, uploaded_file.getbuffer() as upload_buffer:
+                    f.write(upload_buffer)
+                    # Artifacts derived from an upload are cached by the content of the file.
+                    source_key = artifact_key("upload", hashlib.sha1(upload_buffer).hexdigest())
+                st.info(f"Uploaded {uploaded_file.name}")
+                current_video_path = source_video_path
+            elif youtube_link:
+                source_key = artifact_key("youtube", youtube_link)
                 downloaded_video_filename = "downloaded_youtube_video.mp4" # Define a fixed name
-                # Adapt download_youtube_video to save in temp_dir with a specific name
-                source_video_path = download_youtube_video(youtube_link, os.path.join(temp_dir, downloaded_video_filename))
-            if not source_video_path or not os.path.exists(source_video_path):
-                st.error("Failed to download YouTube video.")
-                st.stop() 
-            st.success(f"YouTube video downloaded: {source_video_path}")
-            current_video_path = source_video_path
-        
-        if not current_video_path:
-            st.error("Video source is not available.")
-            st.stop()
-
-        st.success(f"Video ready for processing: {os.path.basename(current_video_path)}")
-
-        # --- Actual processing pipeline ---
-        st.info("Starting processing pipeline...")
-        
-        # 1. Resize (optional)
-        if resize_720p:
-            resized_video_path = os.path.join(temp_dir, f"resized_{os.path.basename(current_video_path)}")
-            with st.spinner("Resizing video..."):
-                current_video_path = resize_video(current_video_path, resized_video_path)
-                # st.info("Video resize placeholder") # Placeholder
-                # current_video_path = os.path.join(temp_dir, "resized_placeholder.mp4") # Placeholder
-            if not current_video_path or not os.path.exists(current_video_path):
-                st.error("Failed to resize video.")
-                st.stop()
-            st.success(f"Video resized: {os.path.basename(current_video_path)}")
-
-        # 2. Extract Audio
-        extracted_audio_path = os.path.join(temp_dir, "original_audio.wav")
-        with st.spinner("Extracting audio..."):
-            extracted_audio_path = extract_audio(current_video_path, extracted_audio_path)
-            # st.info("Audio extraction placeholder") # Placeholder
-        if not extracted_audio_path or not os.path.exists(extracted_audio_path):
-            st.error("Failed to extract audio.")
-            st.stop()
-        st.success(f"Audio extracted: {os.path.basename(extracted_audio_path)}")
-        
-        # 3. Transcribe Audio
-        transcribed_text = None
-        detected_lang = None
-        with st.spinner(f"Transcribing audio with '{whisper_model_size}' model..."):
-            transcribed_text, detected_lang = transcribe_audio(extracted_audio_path, model_name=whisper_model_size)
-        if not transcribed_text or not detected_lang: # Allow empty transcription for silent videos
-            if detected_lang is None and transcribed_text is None: # Actual error
-                st.error("Failed to transcribe audio.")
-                st.stop()
-            elif transcribed_text == "" and detected_lang: # Empty transcription but language detected
-                 st.warning("Audio transcribed as empty. The video might be silent or have very low audio.")
-                 # Proceed with empty string, translation might handle it or TTS might produce silent audio
-            else: # Should not happen if API is consistent
-                st.error("Transcription failed with an unexpected state.")
+                source_video_path = get_cached_file(source_key, os.path.join(temp_dir, downloaded_video_filename))
+                if source_video_path:
+                    st.info("Using previously downloaded YouTube video.")
+                else:
+                    with st.spinner("Fetching YouTube video information..."):
+                        video_info = get_youtube_video_info(youtube_link)
+                    download_size = estimate_download_size(video_info)
+                    size_note = f" (~{download_size / (1024 * 1024):.1f} MB)" if download_size else ""
+                    with st.spinner(f"Downloading YouTube video{size_note}..."):
+                        # Adapt download_youtube_video to save in temp_dir with a specific name
+                        source_video_path = download_youtube_video(youtube_link, os.path.join(temp_dir, downloaded_video_filename), video_info=video_info)
+                    if not source_video_path or not os.path.exists(source_video_path):
+                        st.error("Failed to download YouTube video.")
+                        st.stop() 
+                    cache_file(source_key, source_video_path)
+                st.success(f"YouTube video downloaded: {source_video_path}")
+                current_video_path = source_video_path
+
+            if not current_video_path:
+                st.error("Video source is not available.")
                 st.stop()
 
-        st.success(f"Audio transcribed. Detected language: {detected_lang if detected_lang else 'unknown'}")
-        st.text_area("Transcribed Text", transcribed_text if transcribed_text else "<No speech detected>", height=100)
-
-
-        # 4. Translate Text
-        translated_text = None
-        target_lang_code = language_mapping[target_language_name]
-        if detected_lang == target_lang_code:
-            st.info(f"Source language ({detected_lang}) is the same as target language ({target_lang_code}). Skipping translation.")
-            translated_text = transcribed_text
-        else:
-            with st.spinner(f"Translating text from {detected_lang} to {target_lang_code}..."):
-                translated_text = translate_text(transcribed_text, detected_lang, target_lang_code)
-                # translated_text = "This is a sample translated text." # Placeholder
-                # st.info("Text translation placeholder") # Placeholder
-            if not translated_text:
-                st.error("Failed to translate text.")
+            st.success(f"Video ready for processing: {os.path.basename(current_video_path)}")
+
+            # --- Actual processing pipeline ---
+            st.info("Starting processing pipeline...")
+
+            # 1. Resize (optional) and 2. Extract Audio
+            # All outputs come from one pass over the source video (see resize_and_extract).
+            # Whisper gets 16kHz audio; XTTS voice cloning gets a separate, higher-rate speaker reference.
+            extracted_audio_path = os.path.join(temp_dir, "original_audio.wav")
+            speaker_reference_path = os.path.join(temp_dir, "speaker_reference.wav")
+            # The resized video keeps at most the first 60 seconds; cut the audio the same way.
+            audio_max_duration = 60 if resize_720p else None
+            audio_key = artifact_key(source_key, "audio", audio_max_duration)
+            audio_cached = get_cached_file(audio_key, extracted_audio_path) is not None
+            speaker_key = artifact_key(source_key, "speaker_reference", audio_max_duration, SPEAKER_REFERENCE_SAMPLE_RATE)
+            speaker_cached = get_cached_file(speaker_key, speaker_reference_path) is not None
+            resized_key = artifact_key(source_key, "resize", 720, 720)
+            resized_video_path = os.path.join(temp_dir, f"resized_{os.path.basename(current_video_path)}")
+            resize_cached = resize_720p and get_cached_file(resized_key, resized_video_path) is not None
+            resize_needed = resize_720p and not resize_cached
+
+            if resize_needed or not audio_cached or not speaker_cached:
+                step_name = "Resizing video and extracting audio" if resize_needed else "Extracting audio"
+                with st.spinner(f"{step_name}..."):
+                    resized_output, audio_output, speaker_output = resize_and_extract(
+                        current_video_path,
+                        resized_video_path if resize_needed else None,
+                        None if audio_cached else extracted_audio_path,
+                        None if speaker_cached else speaker_reference_path,
+                        max_duration=audio_max_duration,
+                    )
+                if resize_needed:
+                    if not resized_output or not os.path.exists(resized_output):
+                        st.error("Failed to resize video.")
+                        st.stop()
+                    cache_file(resized_key, resized_output)
+                if not audio_cached:
+                    if not audio_output or not os.path.exists(audio_output):
+                        st.error("Failed to extract audio.")
+                        st.stop()
+                    cache_file(audio_key, audio_output)
+                if not speaker_cached:
+                    if not speaker_output or not os.path.exists(speaker_output):
+                        st.error("Failed to extract audio.")
+                        st.stop()
+                    cache_file(speaker_key, speaker_output)
+
+            if resize_720p:
+                current_video_path = resized_video_path
+                st.success(f"Video resized: {os.path.basename(current_video_path)}")
+            st.success(f"Audio extracted: {os.path.basename(extracted_audio_path)}")
+
+            # 3. Transcribe Audio
+            transcribed_text = None
+            detected_lang = None
+            transcript_key = artifact_key(audio_key, "transcript", whisper_model_size, whisper_compute_type)
+            cached_transcript = get_cached_value(transcript_key)
+            if cached_transcript is not None:
+                transcribed_text, detected_lang = cached_transcript
+            else:
+                with st.spinner(f"Transcribing audio with '{whisper_model_size}' model..."):
+                    transcribed_text, detected_lang = transcribe_audio(
+                        extracted_audio_path,
+                        model_name=whisper_model_size,
+                        compute_type=None if whisper_compute_type == "auto" else whisper_compute_type,
+                    )
+                if transcribed_text is not None and detected_lang:
+                    cache_value(transcript_key, (transcribed_text, detected_lang))
+            if not transcribed_text or not detected_lang: # Allow empty transcription for silent videos
+                if detected_lang is None and transcribed_text is None: # Actual error
+                    st.error("Failed to transcribe audio.")
+                    st.stop()
+                elif transcribed_text == "" and detected_lang: # Empty transcription but language detected
+                    # Nothing to translate or synthesize, so there is nothing to lip sync either.
+                    st.warning("Audio transcribed as empty. The video might be silent or have very low audio. Nothing to dub.")
+                    st.stop()
+                else: # Should not happen if API is consistent
+                    st.error("Transcription failed with an unexpected state.")
+                    st.stop()
+
+            st.success(f"Audio transcribed. Detected language: {detected_lang if detected_lang else 'unknown'}")
+            st.text_area("Transcribed Text", transcribed_text if transcribed_text else "<No speech detected>", height=100)
+
+
+            # 4. Translate Text
+            translated_text = None
+            if detected_lang == target_lang_code:
+                st.info(f"Source language ({detected_lang}) is the same as target language ({target_lang_code}). Skipping translation.")
+                translated_text = transcribed_text
+            else:
+                translation_key = artifact_key(transcript_key, "translation", target_lang_code)
+                translated_text = get_cached_value(translation_key)
+                if translated_text is None:
+                    with st.spinner(f"Translating text from {detected_lang} to {target_lang_code}..."):
+                        try:
+                            translated_text = translate_text(transcribed_text, detected_lang, target_lang_code)
+                        except TranslationError as e:
+                            st.error(f"Failed to translate text: {e}")
+                            st.stop()
+                        # translated_text = "This is a sample translated text." # Placeholder
+                        # st.info("Text translation placeholder") # Placeholder
+                    cache_value(translation_key, translated_text)
+                st.success(f"Text translated to {target_lang_code}.")
+                st.text_area("Translated Text", translated_text, height=100)
+
+            # 5. Synthesize Speech
+            synthesized_audio_path = os.path.join(temp_dir, "synthesized_audio.wav")
+            with st.spinner("Synthesizing speech..."):
+                # Using the original audio, extracted at the speaker reference rate, for voice cloning
+                synthesized_audio_path = synthesize_speech(translated_text, target_lang_code, speaker_reference_path, synthesized_audio_path)
+                # st.info("Speech synthesis placeholder") # Placeholder
+            if not synthesized_audio_path or not os.path.exists(synthesized_audio_path):
+                st.error("Failed to synthesize speech.")
                 st.stop()
-            st.success(f"Text translated to {target_lang_code}.")
-            st.text_area("Translated Text", translated_text, height=100)
-
-        # 5. Synthesize Speech
-        synthesized_audio_path = os.path.join(temp_dir, "synthesized_audio.wav")
-        with st.spinner("Synthesizing speech..."):
-            # Using original extracted audio as speaker reference for voice cloning
-            synthesized_audio_path = synthesize_speech(translated_text, target_lang_code, extracted_audio_path, synthesized_audio_path)
-            # st.info("Speech synthesis placeholder") # Placeholder
-        if not synthesized_audio_path or not os.path.exists(synthesized_audio_path):
-            st.error("Failed to synthesize speech.")
-            st.stop()
-        st.success(f"Speech synthesized: {os.path.basename(synthesized_audio_path)}")
-        st.audio(synthesized_audio_path)
-
-        # Inner try-finally for model-dependent operations and their cleanup
-        try:
+            st.success(f"Speech synthesized: {os.path.basename(synthesized_audio_path)}")
+            st.audio(synthesized_audio_path)
+
             # 6. Lip Sync
             final_video_path = os.path.join(temp_dir, f"final_{os.path.basename(current_video_path)}")
+            lip_sync_progress = st.progress(0.0)
+            lip_sync_log = st.empty()
+
+            def show_lip_sync_progress(fraction, line):
+                if fraction is not None:
+                    lip_sync_progress.progress(fraction)
+                lip_sync_log.text(line)
+
             with st.spinner(f"Performing {quality} lip sync... This may take a while..."):
                 if "Normal" in quality:
-                    final_video_path = run_wav2lip(current_video_path, synthesized_audio_path, final_video_path)
+                    final_video_path = run_wav2lip(current_video_path, synthesized_audio_path, final_video_path, progress_callback=show_lip_sync_progress)
                 else: # High Quality (Video Retalking)
-                    final_video_path = run_video_retalking(current_video_path, synthesized_audio_path, final_video_path)
-            
+                    final_video_path = run_video_retalking(current_video_path, synthesized_audio_path, final_video_path, progress_callback=show_lip_sync_progress)
+            lip_sync_progress.progress(1.0)
+            lip_sync_log.empty()
+
             if not final_video_path or not os.path.exists(final_video_path):
                 st.error("Lip sync process failed or did not produce a video.")
                 st.stop()
             st.success("Lip sync complete!")
-            
+
+            # Keep the result outside temp_dir so that cleanup can run in the background.
+            # A rename within the same filesystem is O(1), regardless of the video size.
+            results_dir = "results"
+            os.makedirs(results_dir, exist_ok=True)
+            result_video_path = os.path.join(results_dir, f"lipsynced_{os.path.basename(current_video_path)}")
+            final_video_path = shutil.move(final_video_path, result_video_path)
+
             # --- End of processing pipeline ---
             st.video(final_video_path)
             with open(final_video_path, "rb") as f_vid:
                 st.download_button("Download Processed Video", data=f_vid, file_name=f"lipsynced_{os.path.basename(current_video_path)}")
-        
-        finally: # Inner finally: Release TTS models
-            with st.spinner("Releasing TTS models from memory..."):
-                release_tts_models() 
-            st.info("TTS Models released from memory.")
-
-    except Exception as e:
-        st.error(f"An error occurred during the main processing pipeline: {e}")
-        # Consider logging the full traceback here for debugging
-        # import traceback
-        # st.text_area("Error Traceback", traceback.format_exc(), height=200)
-    finally: # Outermost finally: Clean up the temporary directory
-        if os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-                st.info(f"Cleaned up temporary directory: {temp_dir}")
-            except Exception as e:
-                st.warning(f"Could not automatically clean up temporary directory {temp_dir}: {e}")
+
+        except Exception as e:
+            st.error(f"An error occurred during the main processing pipeline: {e}")
+            # Consider logging the full traceback here for debugging
+            # import traceback
+            # st.text_area("Error Traceback", traceback.format_exc(), height=200)
+        finally: # Outermost finally: Clean up the temporary directory
+            if os.path.exists(temp_dir):
+                try:
+                    # Deleting several GB of intermediates can take seconds, so it runs in a background thread.
+                    # The directory is renamed first, so the next run can recreate temp_dir right away.
+                    discarded_dir = f"{temp_dir}_discarded_{uuid.uuid4().hex}"
+                    os.rename(temp_dir, discarded_dir)
+                    threading.Thread(target=shutil.rmtree, args=(discarded_dir,), kwargs={"ignore_errors": True}, daemon=True).start()
+                    st.info(f"Cleaning up temporary directory: {temp_dir}")
+                except Exception as e:
+                    st.warning(f"Could not automatically clean up temporary directory {temp_dir}: {e}")
             
 # --- Sidebar for Setup Instructions ---
 st.sidebar.title("Setup & Instructions")
@@ -195,13 +298,14 @@ st.sidebar.info(
 
 with st.sidebar.expander("Whisper Model Setup (Transcription)", expanded=False):
     st.markdown("""
-    1.  **Download Models:**
-        *   Whisper models are language-specific. Download the `.pt` file corresponding to the size you want to use (e.g., `tiny.pt`, `base.pt`, `medium.pt`).
-        *   You can find these via the [OpenAI Whisper GitHub repository](https://github.com/openai/whisper#available-models-and-languages) or Hugging Face.
-    2.  **Place Models:**
-        *   Create a directory: `models/whisper/` in the root of this project.
-        *   Place your downloaded `.pt` files into this directory (e.g., `models/whisper/medium.pt`, `models/whisper/small.pt`).
-    *The application allows you to select the model size from the sidebar. Ensure the corresponding file is present in the `models/whisper/` directory.*
+    1.  **Backend:**
+        *   Transcription runs on [faster-whisper](https://github.com/SYSTRAN/faster-whisper), which executes the Whisper weights with CTranslate2 (int8 on CPU, int8_float16 on GPU by default; see "Advanced" in the controls).
+    2.  **Models:**
+        *   The converted model for the selected size is downloaded automatically into `models/whisper/` the first time it is used, and reused from there afterwards.
+        *   For offline machines, run the application once with network access (or copy a populated `models/whisper/` directory) for each size you want to use.
+        *   A model converted ahead of time with `ct2-transformers-converter` can be placed in `models/whisper/<size>-ct2/` (e.g. `models/whisper/medium-ct2/`); it is used instead of a download.
+        *   If faster-whisper is not installed, the original `openai-whisper` package is used instead (its `.pt` checkpoints are also kept in `models/whisper/`).
+    *The application allows you to select the model size from the sidebar. "large" uses the `large-v3` checkpoint.*
     """)
 
 with st.sidebar.expander("Coqui XTTSv2 Model Setup (Speech Synthesis)", expanded=False):
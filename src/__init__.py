@@ -0,0 +1,6 @@
+import os
+
+# CUDA caching allocator settings for the variable-sized allocations of Whisper, XTTS and Wav2Lip:
+# expandable segments avoid fragmentation-induced OOMs, max_split_size_mb stops large cached blocks from
+# being split for small requests. Set before any submodule imports torch; an existing value is kept.
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:1024")
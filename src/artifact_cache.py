@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import shutil
+
+try:
+    import diskcache # Optional: without it every run recomputes all pipeline steps
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache for deterministic pipeline artifacts (downloaded/resized videos, extracted audio,
+# transcripts, translations). Unlike temp_processing_space it survives between runs.
+# Anchored to the project root so it does not depend on the working directory.
+ARTIFACT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".kalanabha_cache")
+# Least recently used artifacts are evicted once the cache grows past this size.
+ARTIFACT_CACHE_SIZE_LIMIT = 20 * 1024 ** 3 # 20 GB
+
+artifact_cache_instance = None
+
+def get_artifact_cache():
+    """
+    Returns the diskcache.Cache for pipeline artifacts, or None if diskcache is not installed.
+    """
+    global artifact_cache_instance
+    if diskcache is None:
+        return None
+    if artifact_cache_instance is None:
+        artifact_cache_instance = diskcache.Cache(
+            ARTIFACT_CACHE_DIR,
+            size_limit=ARTIFACT_CACHE_SIZE_LIMIT,
+            eviction_policy="least-recently-used",
+        )
+    return artifact_cache_instance
+
+def artifact_key(*parts):
+    """
+    Builds a cache key from the given parts. Each step keys its output on the key of its input plus
+    its own parameters, so a changed input invalidates every artifact derived from it.
+    """
+    return hashlib.sha1("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def get_cached_file(key, output_path):
+    """
+    Places the cached file for key at output_path.
+
+    Returns:
+        str: output_path on a cache hit, or None on a miss (or if caching is unavailable).
+    """
+    cache = get_artifact_cache()
+    if cache is None:
+        return None
+    try:
+        cached_file = cache.get(key, read=True)
+        if cached_file is None:
+            return None
+        with cached_file:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            try:
+                # A hard link is instant, and the pipeline's copy stays valid even if the cache evicts the entry.
+                os.link(cached_file.name, output_path)
+            except OSError: # e.g. the cache and the working directory are on different filesystems
+                with open(output_path, "wb") as f:
+                    shutil.copyfileobj(cached_file, f, length=16 * 1024 * 1024)
+    except Exception as e: # A broken cache is treated as a miss; the step is recomputed
+        logger.warning("Could not read cached artifact for %s: %s", output_path, e)
+        if os.path.exists(output_path): # Don't leave a partial copy behind
+            os.remove(output_path)
+        return None
+    logger.info("Using cached artifact for %s.", os.path.basename(output_path))
+    return output_path
+
+def cache_file(key, file_path):
+    """Stores the contents of file_path in the artifact cache under key."""
+    cache = get_artifact_cache()
+    if cache is None:
+        return
+    try:
+        with open(file_path, "rb") as f:
+            cache.set(key, f, read=True)
+    except Exception as e: # Caching is best effort; the pipeline result is unaffected
+        logger.warning("Could not cache %s: %s", file_path, e)
+
+def get_cached_value(key):
+    """Returns the cached value (e.g. a transcript) for key, or None."""
+    cache = get_artifact_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning("Could not read cached value for key %s: %s", key, e)
+        return None
+
+def cache_value(key, value):
+    """Stores a small picklable value (e.g. a transcript) in the artifact cache under key."""
+    cache = get_artifact_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, value)
+    except Exception as e:
+        logger.warning("Could not cache value for key %s: %s", key, e)
@@ -1,11 +1,466 @@
+import contextlib
+import importlib.util
+import logging
+import multiprocessing
 import os
+import queue
+import re
 import subprocess
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import torch
+from tqdm import tqdm
+
+try:
+    import decord # Optional: faster (and, with a CUDA build, NVDEC) video decoding for Wav2Lip
+except ImportError:
+    decord = None
+
+logger = logging.getLogger(__name__)
 
 # Base directory for vendored models like Video-Retalking and Wav2Lip
 VENDOR_DIR = "vendor"
 VIDEO_RETALKING_DIR = os.path.join(VENDOR_DIR, "video-retalking") # Corrected path
 WAV2LIP_DIR = os.path.join(VENDOR_DIR, "Wav2Lip")
 
+# Files the lip-sync scripts need, relative to their vendor directories.
+WAV2LIP_CHECKPOINT_REL_PATH = os.path.join("checkpoints", "wav2lip_gan.pth") # Or "wav2lip.pth"
+WAV2LIP_FACE_DETECTOR_REL_PATH = os.path.join("face_detection", "detection", "sfd", "s3fd.pth")
+VIDEO_RETALKING_CHECKPOINT_REL_PATH = os.path.join("checkpoints", "RetalkingHead.pt") # A key checkpoint
+
+def _missing_setup_files(vendor_dir, required_rel_paths):
+    """Returns the paths (vendor directory or files inside it) that are missing for a lip-sync model."""
+    if not os.path.isdir(vendor_dir):
+        return [vendor_dir]
+    return [os.path.join(vendor_dir, rel_path) for rel_path in required_rel_paths
+            if not os.path.exists(os.path.join(vendor_dir, rel_path))]
+
+# The setup is checked once at import, so problems show up when the app starts rather than at the end
+# of a pipeline run. Restart the app after installing a model.
+WAV2LIP_MISSING_FILES = _missing_setup_files(WAV2LIP_DIR, [WAV2LIP_CHECKPOINT_REL_PATH, WAV2LIP_FACE_DETECTOR_REL_PATH])
+WAV2LIP_READY = not WAV2LIP_MISSING_FILES
+VIDEO_RETALKING_MISSING_FILES = _missing_setup_files(VIDEO_RETALKING_DIR, [VIDEO_RETALKING_CHECKPOINT_REL_PATH])
+VIDEO_RETALKING_READY = not VIDEO_RETALKING_MISSING_FILES
+
+# Number of output lines kept from a lip-sync run for error reports.
+LOG_TAIL_LINES = 200
+# Matches the percentage printed by tqdm progress bars, e.g. " 45%|████▌     | 45/100".
+TQDM_PERCENT_REGEX = re.compile(r"(\d{1,3})%\|")
+
+
+def _run_streaming(command, cwd, progress_callback=None):
+    """
+    Runs a lip-sync inference script and reads its output while it runs, instead of buffering
+    everything until it exits. Only the last LOG_TAIL_LINES lines are kept for diagnostics.
+
+    Args:
+        command (list): Command to execute.
+        cwd (str): Working directory for the command.
+        progress_callback (callable): Optional callback(fraction, line) invoked for every output line;
+                                      fraction is the latest tqdm percentage as 0..1, or None if none was seen yet.
+
+    Returns:
+        tuple: (return_code, output_tail) where output_tail is the last lines of combined stdout/stderr.
+    """
+    output_tail = deque(maxlen=LOG_TAIL_LINES)
+    fraction = None
+    # text=True enables universal newlines, so tqdm's carriage-return updates arrive as separate lines.
+    with subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+        for line in process.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            output_tail.append(line)
+            match = TQDM_PERCENT_REGEX.search(line)
+            if match:
+                fraction = min(int(match.group(1)), 100) / 100
+            if progress_callback is not None:
+                progress_callback(fraction, line)
+    return process.returncode, "\n".join(output_tail)
+
+
+# --- In-process execution of the vendored inference scripts ---
+# Importing inference.py once and calling its main() avoids starting a new Python interpreter
+# (torch/CUDA initialisation) for every run, and lets the loaded models be reused between runs.
+# The scripts need their own working directory, sys.argv and top-level modules, which are process-wide,
+# so they run in one persistent worker process (see _run_in_lip_sync_worker), never in the app's process.
+# Everything below up to _run_in_lip_sync_worker is only used inside that worker.
+
+# Imported inference.py modules, keyed by vendor directory.
+vendor_script_instances = {}
+# Modules imported from each vendor directory (e.g. Wav2Lip's "models" and "audio"). Both repositories
+# use generic top-level names ("models", "utils"), so each vendor's modules are only installed in
+# sys.modules while that vendor's script is running.
+vendor_module_instances = {}
+# Wav2Lip generator and face detector, loaded once and shared by all in-process runs.
+wav2lip_model_instances = {}
+# Run S3FD face detection only on every n-th frame; boxes for the frames in between are interpolated.
+FACE_DETECTION_STRIDE = 5
+# Run the Wav2Lip generator in float16 on CUDA (the S3FD face detector always stays in float32).
+WAV2LIP_FP16 = True
+
+class HalfPrecisionGenerator(torch.nn.Module):
+    """
+    Wraps the Wav2Lip generator so it runs with float16 weights under CUDA autocast,
+    while callers keep passing and receiving float32 tensors.
+    """
+    def __init__(self, generator):
+        super().__init__()
+        self.generator = generator.half()
+
+    def forward(self, audio_sequences, face_sequences):
+        with torch.autocast(device_type="cuda", dtype=torch.float16):
+            return self.generator(audio_sequences, face_sequences).float()
+
+
+@contextlib.contextmanager
+def _vendor_context(vendor_dir, argv):
+    """
+    Temporarily sets up the interpreter the way running `python inference.py <argv>` inside vendor_dir would:
+    working directory, sys.argv, sys.path and the vendor's own modules in sys.modules.
+    Only used in the lip-sync worker process, which runs one task at a time.
+    """
+    vendor_dir_abs = os.path.abspath(vendor_dir)
+    owned_modules = vendor_module_instances.setdefault(vendor_dir_abs, {})
+    displaced_modules = {name: sys.modules[name] for name in owned_modules if name in sys.modules}
+    sys.modules.update(owned_modules)
+
+    previous_cwd, previous_argv = os.getcwd(), sys.argv
+    os.chdir(vendor_dir_abs)
+    sys.argv = argv
+    sys.path.insert(0, vendor_dir_abs)
+    try:
+        yield
+    finally:
+        sys.path.remove(vendor_dir_abs)
+        sys.argv = previous_argv
+        os.chdir(previous_cwd)
+        # Collect modules the vendor code imported from its own tree and take them out of sys.modules again.
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None) or ""
+            if module_file and os.path.abspath(module_file).startswith(vendor_dir_abs + os.sep):
+                owned_modules[name] = module
+        for name in owned_modules:
+            sys.modules.pop(name, None)
+        sys.modules.update(displaced_modules)
+
+
+def _load_vendor_script(vendor_dir, argv):
+    """
+    Imports vendor_dir/inference.py once (argv is used for the module-level argument parsing)
+    and returns the module, or None if it cannot be imported in-process.
+    """
+    vendor_dir_abs = os.path.abspath(vendor_dir)
+    if vendor_dir_abs not in vendor_script_instances:
+        script_path = os.path.join(vendor_dir_abs, "inference.py")
+        module_name = f"_vendor_inference_{os.path.basename(vendor_dir_abs).replace('-', '_')}"
+        try:
+            with _vendor_context(vendor_dir, argv):
+                spec = importlib.util.spec_from_file_location(module_name, script_path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+        except (Exception, SystemExit) as e: # argparse exits on bad arguments
+            logger.warning("Could not import %s in-process (%s); falling back to a subprocess.", script_path, e)
+            return None
+        vendor_script_instances[vendor_dir_abs] = module
+    return vendor_script_instances[vendor_dir_abs]
+
+
+def _make_progress_tqdm(progress_callback):
+    """Returns a tqdm class that also reports its progress to progress_callback(fraction, line)."""
+    class ProgressTqdm(tqdm):
+        def display(self, *args, **kwargs):
+            displayed = super().display(*args, **kwargs)
+            if self.total:
+                progress_callback(min(self.n / self.total, 1.0), str(self))
+            return displayed
+    return ProgressTqdm if progress_callback is not None else tqdm
+
+
+def _run_vendor_main(module, vendor_dir, argv, progress_callback=None):
+    """Runs module.main() with the vendor's working directory/argv and its tqdm bars reporting progress."""
+    module.tqdm = _make_progress_tqdm(progress_callback)
+    try:
+        with _vendor_context(vendor_dir, argv):
+            module.main()
+    except SystemExit as e:
+        raise RuntimeError(f"{os.path.basename(vendor_dir)} inference exited with status {e.code}.")
+
+
+class DecordVideoCapture:
+    """
+    Minimal stand-in for cv2.VideoCapture backed by decord, covering what Wav2Lip's inference.py uses
+    (read, get, release). Frames are decoded in batches (on the GPU when decord is built with CUDA)
+    and returned as BGR arrays like OpenCV's.
+    """
+    def __init__(self, video_path, cv2_module, batch_size=32):
+        self.cv2 = cv2_module
+        self.batch_size = batch_size
+        self.reader = None
+        if torch.cuda.is_available():
+            try:
+                self.reader = decord.VideoReader(video_path, ctx=decord.gpu(0))
+            except Exception: # decord without CUDA support
+                self.reader = None
+        if self.reader is None:
+            self.reader = decord.VideoReader(video_path, ctx=decord.cpu(0))
+        self.position = 0
+        self.pending_frames = deque()
+
+    def isOpened(self):
+        return self.reader is not None
+
+    def get(self, prop_id):
+        if prop_id == self.cv2.CAP_PROP_FPS:
+            return self.reader.get_avg_fps()
+        if prop_id == self.cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.reader)
+        if prop_id == self.cv2.CAP_PROP_FRAME_WIDTH:
+            return self.reader[0].shape[1]
+        if prop_id == self.cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.reader[0].shape[0]
+        return 0
+
+    def read(self):
+        if not self.pending_frames:
+            if self.reader is None or self.position >= len(self.reader):
+                return False, None
+            end = min(self.position + self.batch_size, len(self.reader))
+            batch = self.reader.get_batch(list(range(self.position, end))).asnumpy()
+            self.position = end
+            self.pending_frames.extend(batch[..., ::-1]) # RGB -> BGR
+        return True, np.ascontiguousarray(self.pending_frames.popleft())
+
+    def release(self):
+        self.reader = None
+        self.pending_frames.clear()
+
+
+class Cv2WithDecordCapture:
+    """Proxy for the cv2 module that opens video files with DecordVideoCapture and forwards everything else to cv2."""
+    def __init__(self, cv2_module):
+        self._cv2 = cv2_module
+
+    def VideoCapture(self, source, *args):
+        if isinstance(source, str) and os.path.isfile(source):
+            try:
+                return DecordVideoCapture(source, self._cv2)
+            except Exception as e:
+                logger.warning("decord could not open %s (%s); using OpenCV instead.", source, e)
+        return self._cv2.VideoCapture(source, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._cv2, name)
+
+
+def _sampled_face_detect(module, images):
+    """
+    Drop-in replacement for Wav2Lip's face_detect(images): runs the face detector on every
+    FACE_DETECTION_STRIDE-th frame only and linearly interpolates the face boxes for the other frames.
+    Returns the same [[face_crop, (y1, y2, x1, x2)], ...] list as the original.
+    """
+    args = module.args
+    frame_count = len(images)
+    if frame_count == 0:
+        return []
+    sampled_indices = list(range(0, frame_count, FACE_DETECTION_STRIDE))
+    if sampled_indices[-1] != frame_count - 1:
+        sampled_indices.append(frame_count - 1)
+    sampled_images = [images[i] for i in sampled_indices]
+
+    detector = module.face_detection.FaceAlignment(module.face_detection.LandmarksType._2D, flip_input=False, device=module.device)
+    batch_size = args.face_det_batch_size
+    while True:
+        predictions = []
+        try:
+            for i in module.tqdm(range(0, len(sampled_images), batch_size)):
+                predictions.extend(detector.get_detections_for_batch(np.array(sampled_images[i:i + batch_size])))
+        except RuntimeError:
+            # Same out-of-memory recovery as the original face_detect.
+            if batch_size == 1:
+                raise RuntimeError("Image too big to run face detection on GPU. Please use the --resize_factor argument")
+            batch_size //= 2
+            logger.warning("Recovering from OOM error; New batch size: %s", batch_size)
+            continue
+        break
+
+    pady1, pady2, padx1, padx2 = args.pads
+    sampled_boxes = []
+    for rect, image in zip(predictions, sampled_images):
+        if rect is None:
+            raise ValueError("Face not detected! Ensure the video contains a face in all the frames.")
+        sampled_boxes.append([
+            max(0, rect[0] - padx1),
+            max(0, rect[1] - pady1),
+            min(image.shape[1], rect[2] + padx2),
+            min(image.shape[0], rect[3] + pady2),
+        ])
+    sampled_boxes = np.array(sampled_boxes, dtype=np.float64)
+
+    if len(sampled_indices) == frame_count: # Every frame was detected (e.g. a single frame); nothing to interpolate
+        boxes = sampled_boxes
+    else:
+        all_indices = np.arange(frame_count)
+        boxes = np.stack([np.interp(all_indices, sampled_indices, sampled_boxes[:, c]) for c in range(4)], axis=1)
+    if not args.nosmooth:
+        boxes = module.get_smoothened_boxes(boxes, T=5)
+    boxes = np.rint(boxes).astype(int)
+    return [[image[y1:y2, x1:x2], (y1, y2, x1, x2)] for image, (x1, y1, x2, y2) in zip(images, boxes)]
+
+
+def _install_wav2lip_model_cache(module):
+    """
+    Replaces the model loaders used by Wav2Lip's inference.py (which load the generator and the
+    S3FD face detector on every call of main()) with versions that reuse wav2lip_model_instances,
+    its per-frame face_detect with _sampled_face_detect and, if decord is installed, its OpenCV
+    frame reader with DecordVideoCapture.
+    """
+    if getattr(module, "_uses_model_cache", False):
+        return
+    load_generator = module.load_model
+    create_face_detector = module.face_detection.FaceAlignment
+
+    def cached_load_model(checkpoint_path):
+        key = ("generator", os.path.abspath(checkpoint_path))
+        if key not in wav2lip_model_instances:
+            generator = load_generator(checkpoint_path)
+            if WAV2LIP_FP16 and torch.cuda.is_available():
+                generator = HalfPrecisionGenerator(generator).eval()
+            wav2lip_model_instances[key] = generator
+        return wav2lip_model_instances[key]
+
+    def cached_face_alignment(*args, **kwargs):
+        key = ("face_detector", repr(args), repr(sorted(kwargs.items())))
+        if key not in wav2lip_model_instances:
+            wav2lip_model_instances[key] = create_face_detector(*args, **kwargs)
+        return wav2lip_model_instances[key]
+
+    module.load_model = cached_load_model
+    module.face_detection.FaceAlignment = cached_face_alignment
+    module.face_detect = lambda images: _sampled_face_detect(module, images)
+    if decord is not None:
+        module.cv2 = Cv2WithDecordCapture(module.cv2)
+    module._uses_model_cache = True
+
+
+# Progress queue of the lip-sync worker process (set by _init_lip_sync_worker).
+worker_progress_queue = None
+
+
+def _init_lip_sync_worker(progress_queue):
+    """Initializer of the lip-sync worker process."""
+    global worker_progress_queue
+    worker_progress_queue = progress_queue
+    # Only lip sync runs in this process, so TF32 tensor-core math for its float32 parts
+    # (face detector, Video-Retalking) is enabled once for the worker's lifetime.
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+
+def _report_worker_progress(fraction, line):
+    """progress_callback used inside the worker: forwards progress to the app's process."""
+    worker_progress_queue.put((fraction, line))
+
+
+def _lip_sync_worker_task(kind, vendor_dir, argv):
+    """
+    Runs one vendor inference script inside the lip-sync worker process.
+    kind is "wav2lip" or "video_retalking"; argv is ["inference.py", <options>].
+    Returns False if the script cannot be imported in-process (the caller then runs it as a subprocess).
+    """
+    module = _load_vendor_script(vendor_dir, argv)
+    if module is None:
+        return False
+    if kind == "wav2lip":
+        _install_wav2lip_model_cache(module)
+        # inference.py parses its arguments into a module-level `args` at import time; refresh them for this run.
+        args = module.parser.parse_args(argv[1:])
+        args.img_size = 96
+        args.static = os.path.splitext(args.face)[1].lower() in [".jpg", ".png", ".jpeg"] or args.static
+        module.args = args
+        # Wav2Lip feeds fixed-size 96x96 face batches, so cuDNN autotuning pays off here. It is only enabled
+        # for Wav2Lip runs: Video-Retalking shares this worker and its networks see a new input size for
+        # every video resolution, which would re-run the autotuner each time.
+        previous_benchmark = torch.backends.cudnn.benchmark
+        torch.backends.cudnn.benchmark = True
+        try:
+            _run_vendor_main(module, vendor_dir, argv, _report_worker_progress)
+        finally:
+            torch.backends.cudnn.benchmark = previous_benchmark
+    else:
+        # inference.py reads its options into a module-level `args` at import time; refresh them for this run.
+        with _vendor_context(vendor_dir, argv):
+            module.args = module.options()
+        _run_vendor_main(module, vendor_dir, argv, _report_worker_progress)
+    return True
+
+
+# The lip-sync worker process: (ProcessPoolExecutor with one worker, progress queue), created on first use.
+# It keeps the imported scripts and loaded models between runs; release_lip_sync_models shuts it down.
+lip_sync_worker_instance = None
+# Serializes the app's lip-sync runs: the worker runs one task at a time and its progress queue is shared.
+lip_sync_worker_lock = threading.Lock()
+
+
+def _run_in_lip_sync_worker(kind, vendor_dir, argv, progress_callback=None):
+    """
+    Runs a vendor inference script in the lip-sync worker process, forwarding its progress to
+    progress_callback(fraction, line). Returns False if the script cannot be imported in-process.
+    """
+    global lip_sync_worker_instance
+    with lip_sync_worker_lock:
+        if lip_sync_worker_instance is None:
+            # spawn: a forked copy of a process that has initialised CUDA cannot use CUDA.
+            context = multiprocessing.get_context("spawn")
+            progress_queue = context.Queue()
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                           initializer=_init_lip_sync_worker, initargs=(progress_queue,))
+            lip_sync_worker_instance = (executor, progress_queue)
+        executor, progress_queue = lip_sync_worker_instance
+        try:
+            while True: # Drop late progress lines of a previous run
+                progress_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        future = executor.submit(_lip_sync_worker_task, kind, os.path.abspath(vendor_dir), argv)
+        try:
+            while True:
+                try:
+                    fraction, line = progress_queue.get(timeout=0.2)
+                except queue.Empty:
+                    if future.done():
+                        break
+                    continue
+                if progress_callback is not None:
+                    progress_callback(fraction, line)
+            return future.result()
+        except BrokenProcessPool as e:
+            # The worker died (e.g. killed for running out of memory); the next run starts a new one.
+            # Stop the broken pool's management thread and the queue's feeder thread so they do not leak.
+            executor.shutdown(wait=False, cancel_futures=True)
+            progress_queue.close()
+            lip_sync_worker_instance = None
+            raise RuntimeError(f"The lip-sync worker process exited unexpectedly: {e}")
+
+
+def release_lip_sync_models():
+    """Releases the in-process Wav2Lip/Video-Retalking models by stopping the lip-sync worker process."""
+    global lip_sync_worker_instance
+    with lip_sync_worker_lock:
+        if lip_sync_worker_instance is not None:
+            logger.info("Releasing lip-sync models from memory...")
+            executor, progress_queue = lip_sync_worker_instance
+            executor.shutdown(wait=True)
+            progress_queue.close()
+            lip_sync_worker_instance = None
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
 
 # --- Video Retalking (High Quality) ---
 def get_video_retalking_readme_instructions():
@@ -75,10 +530,15 @@ def get_video_retalking_readme_instructions():
     return instructions
 
 
-def run_video_retalking(video_path, audio_path, output_path="results/retalked_video.mp4"):
+def run_video_retalking(video_path, audio_path, output_path="results/retalked_video.mp4", progress_callback=None,
+                        in_process=True):
     """
     Runs Video Retalking inference.
     Assumes Video-Retalking repository and models are set up in VENDOR_DIR.
+    progress_callback(fraction, line) is called with progress updates as it runs (see _run_streaming).
+    With in_process=True the inference script is imported once in the persistent lip-sync worker process
+    and run there; if it cannot be imported, it is run as a subprocess instead. Worker runs are serialized
+    (one at a time); subprocess runs are not.
     """
     video_path_abs = os.path.abspath(video_path)
     audio_path_abs = os.path.abspath(audio_path)
@@ -86,45 +546,47 @@ def run_video_retalking(video_path, audio_path, output_path="results/retalked_vi
     
     os.makedirs(os.path.dirname(output_path_abs), exist_ok=True)
 
-    # Check if the Video-Retalking directory and a key checkpoint exist
-    if not os.path.isdir(VIDEO_RETALKING_DIR):
-        error_msg = f"Video-Retalking directory not found at '{VIDEO_RETALKING_DIR}'. Please follow setup instructions."
-        print(error_msg)
-        raise FileNotFoundError(error_msg)
-        
-    expected_checkpoint = os.path.join(VIDEO_RETALKING_DIR, "checkpoints", "RetalkingHead.pt") # A key checkpoint
-    if not os.path.exists(expected_checkpoint):
-        error_msg = f"Video-Retalking key checkpoint not found at '{expected_checkpoint}'. Ensure models are downloaded correctly."
-        print(error_msg)
+    if not VIDEO_RETALKING_READY:
+        error_msg = f"Video-Retalking is not set up, missing: {', '.join(VIDEO_RETALKING_MISSING_FILES)}. Please follow setup instructions."
+        logger.error(error_msg)
         raise FileNotFoundError(error_msg)
 
-    print(f"Running Video-Retalking on {video_path_abs} with audio {audio_path_abs}...")
+    logger.info("Running Video-Retalking on %s with audio %s...", video_path_abs, audio_path_abs)
     command = [
         "python", "inference.py",
         "--face", video_path_abs, 
         "--audio", audio_path_abs, 
         "--outfile", output_path_abs 
     ]
+
+    if in_process:
+        try:
+            ran_in_process = _run_in_lip_sync_worker("video_retalking", VIDEO_RETALKING_DIR, command[1:], progress_callback)
+        except Exception as e:
+            error_msg = f"An unexpected error occurred during Video-Retalking execution: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        if ran_in_process:
+            logger.info("Video-Retalking finished. Output: %s", output_path_abs)
+            return output_path_abs
+
     try:
-        process = subprocess.run(command, cwd=VIDEO_RETALKING_DIR, check=False, capture_output=True, text=True)
-        if process.returncode != 0:
-            error_message = f"Video-Retalking inference.py script failed with return code {process.returncode}.\n" \
-                            f"Stdout: {process.stdout}\nStderr: {process.stderr}"
-            print(error_message)
+        return_code, output_tail = _run_streaming(command, VIDEO_RETALKING_DIR, progress_callback)
+        if return_code != 0:
+            error_message = f"Video-Retalking inference.py script failed with return code {return_code}.\n" \
+                            f"Output (last {LOG_TAIL_LINES} lines): {output_tail}"
+            logger.error(error_message)
             raise RuntimeError(error_message)
         
-        print(f"Video-Retalking finished. Output: {output_path_abs}")
-        # print(f"Stdout: {process.stdout}") # Can be very verbose
-        if process.stderr: # Print stderr if any, even on success, for warnings
-            print(f"Video-Retalking Stderr (may contain warnings): {process.stderr}")
+        logger.info("Video-Retalking finished. Output: %s", output_path_abs)
         return output_path_abs
     except FileNotFoundError as fnf_error: # e.g. if python or inference.py is not found
         error_msg = f"Could not execute Video-Retalking script. Ensure Python is in PATH and script exists: {fnf_error}"
-        print(error_msg)
+        logger.error(error_msg)
         raise RuntimeError(error_msg)
     except Exception as e: # Catch any other unexpected error during subprocess execution
         error_msg = f"An unexpected error occurred during Video-Retalking execution: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         raise RuntimeError(error_msg)
 
 # --- Wav2Lip (Normal Quality) ---
@@ -195,10 +657,14 @@ def get_wav2lip_readme_instructions():
 
 
 def run_wav2lip(video_path, audio_path, output_path="results/wav2lip_video.mp4",
-                pads=(0, 10, 0, 0), resize_factor=1, nosmooth=False):
+                pads=(0, 10, 0, 0), resize_factor=1, nosmooth=False, progress_callback=None, in_process=True):
     """
     Runs Wav2Lip inference.
     Assumes Wav2Lip repository and models are set up in VENDOR_DIR.
+    progress_callback(fraction, line) is called with progress updates as it runs (see _run_streaming).
+    With in_process=True the inference script is imported once in the persistent lip-sync worker process
+    and run there, reusing the generator and face detector between runs; if it cannot be imported, it is
+    run as a subprocess instead. Worker runs are serialized (one at a time); subprocess runs are not.
     """
     video_path_abs = os.path.abspath(video_path)
     audio_path_abs = os.path.abspath(audio_path)
@@ -208,30 +674,13 @@ def run_wav2lip(video_path, audio_path, output_path="results/wav2lip_video.mp4",
 
     # Path to the Wav2Lip checkpoint, relative to WAV2LIP_DIR
     # User must place the model here as per setup instructions
-    wav2lip_checkpoint_filename = "wav2lip_gan.pth" # Or "wav2lip.pth"
-    wav2lip_checkpoint_rel_path = os.path.join("checkpoints", wav2lip_checkpoint_filename)
-    
-    if not os.path.isdir(WAV2LIP_DIR):
-        error_msg = f"Wav2Lip directory not found at '{WAV2LIP_DIR}'. Please follow setup instructions."
-        print(error_msg)
-        raise FileNotFoundError(error_msg)
-
-    wav2lip_checkpoint_filename = "wav2lip_gan.pth" # Or "wav2lip.pth" if preferred
-    wav2lip_checkpoint_rel_path = os.path.join("checkpoints", wav2lip_checkpoint_filename)
-    wav2lip_checkpoint_abs_path = os.path.join(WAV2LIP_DIR, wav2lip_checkpoint_rel_path)
-    if not os.path.exists(wav2lip_checkpoint_abs_path):
-        error_msg = f"Wav2Lip model checkpoint not found at '{wav2lip_checkpoint_abs_path}'. Ensure models are downloaded."
-        print(error_msg)
-        raise FileNotFoundError(error_msg)
-    
-    face_detector_model_rel_path = os.path.join("face_detection", "detection", "sfd", "s3fd.pth")
-    face_detector_model_abs_path = os.path.join(WAV2LIP_DIR, face_detector_model_rel_path)
-    if not os.path.exists(face_detector_model_abs_path):
-        error_msg = f"Wav2Lip face detector model not found at '{face_detector_model_abs_path}'. Ensure setup is complete."
-        print(error_msg)
+    wav2lip_checkpoint_rel_path = WAV2LIP_CHECKPOINT_REL_PATH
+    if not WAV2LIP_READY:
+        error_msg = f"Wav2Lip is not set up, missing: {', '.join(WAV2LIP_MISSING_FILES)}. Please follow setup instructions."
+        logger.error(error_msg)
         raise FileNotFoundError(error_msg)
 
-    print(f"Running Wav2Lip on {video_path_abs} with audio {audio_path_abs}...")
+    logger.info("Running Wav2Lip on %s with audio %s...", video_path_abs, audio_path_abs)
     command = [
         "python", "inference.py",
         "--checkpoint_path", wav2lip_checkpoint_rel_path, 
@@ -244,29 +693,38 @@ def run_wav2lip(video_path, audio_path, output_path="results/wav2lip_video.mp4",
     if nosmooth:
         command.append("--nosmooth")
 
+    if in_process:
+        try:
+            ran_in_process = _run_in_lip_sync_worker("wav2lip", WAV2LIP_DIR, command[1:], progress_callback)
+        except Exception as e:
+            error_msg = f"An unexpected error occurred during Wav2Lip execution: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        if ran_in_process:
+            logger.info("Wav2Lip finished. Output: %s", output_path_abs)
+            return output_path_abs
+
     try:
-        process = subprocess.run(command, cwd=WAV2LIP_DIR, check=False, capture_output=True, text=True)
-        if process.returncode != 0:
-            error_message = f"Wav2Lip inference.py script failed with return code {process.returncode}.\n" \
-                            f"Stdout: {process.stdout}\nStderr: {process.stderr}"
-            print(error_message)
+        return_code, output_tail = _run_streaming(command, WAV2LIP_DIR, progress_callback)
+        if return_code != 0:
+            error_message = f"Wav2Lip inference.py script failed with return code {return_code}.\n" \
+                            f"Output (last {LOG_TAIL_LINES} lines): {output_tail}"
+            logger.error(error_message)
             raise RuntimeError(error_message)
             
-        print(f"Wav2Lip finished. Output: {output_path_abs}")
-        # print(f"Stdout: {process.stdout}") # Can be verbose
-        if process.stderr: # Print stderr if any, even on success
-            print(f"Wav2Lip Stderr (may contain warnings): {process.stderr}")
+        logger.info("Wav2Lip finished. Output: %s", output_path_abs)
         return output_path_abs
     except FileNotFoundError as fnf_error: # e.g. if python or inference.py is not found
         error_msg = f"Could not execute Wav2Lip script. Ensure Python is in PATH and script exists: {fnf_error}"
-        print(error_msg)
+        logger.error(error_msg)
         raise RuntimeError(error_msg)
     except Exception as e:
         error_msg = f"An unexpected error occurred during Wav2Lip execution: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         raise RuntimeError(error_msg)
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     # This section is for testing and won't run when imported.
     # It requires dummy files and that the setup functions are run or models are already in place.
     # It requires dummy files and that the setup functions are run or models are already in place.
@@ -296,8 +754,7 @@ if __name__ == '__main__':
     print("\n--- Testing Video Retalking ---")
     # First, ensure models are downloaded and set up:
     # setup_video_retalking() # Call this if you haven't set it up manually or via a setup script
-    if os.path.exists(VIDEO_RETALKING_DIR) and \
-       os.path.exists(os.path.join(VIDEO_RETALKING_DIR, "checkpoints", "RetalkingHead.pt")):
+    if VIDEO_RETALKING_READY:
         retalked_output = run_video_retalking(dummy_video, dummy_audio, "results/retalked_dummy.mp4")
         if retalked_output:
             print(f"Video Retalking test output: {retalked_output}")
@@ -310,8 +767,7 @@ if __name__ == '__main__':
     print("\n--- Testing Wav2Lip ---")
     # First, ensure models are downloaded and set up:
     # setup_wav2lip() # Call this if you haven't set it up manually
-    if os.path.exists(WAV2LIP_DIR) and \
-       os.path.exists(os.path.join(WAV2LIP_DIR, "checkpoints", "wav2lip_gan.pth")):
+    if WAV2LIP_READY:
         wav2lip_output = run_wav2lip(dummy_video, dummy_audio, "results/wav2lip_dummy.mp4")
         if wav2lip_output:
             print(f"Wav2Lip test output: {wav2lip_output}")
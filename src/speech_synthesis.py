@@ -1,10 +1,79 @@
+import asyncio
+import logging
 import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import soundfile as sf
 import torch
+import torchaudio
 from TTS.api import TTS
+from src.utils import split_sentences
+
+logger = logging.getLogger(__name__)
 
 # Global variable to hold the TTS model instance
 tts_model_instance = None
 
+# Maximum number of synthesize_speech calls using the model at the same time; further callers wait.
+# XTTS must not run parallel forward passes on one model instance, so only raise this when each
+# concurrent caller has its own model. The value also bounds the TTS share of VRAM.
+TTS_CONCURRENT_REQUESTS = int(os.getenv("TTS_CONCURRENT_REQUESTS", "1"))
+# A thread semaphore (not asyncio.Semaphore) so that it also gates Streamlit sessions, which run in
+# separate threads, and callers from different event loops.
+tts_semaphore = threading.BoundedSemaphore(TTS_CONCURRENT_REQUESTS)
+
+# XTTS speaker conditioning (GPT conditioning latents, speaker embedding) per reference recording, keyed by
+# (path, modification time, size). Computing it means running the conditioning encoder over the whole recording.
+# Kept in least-recently-used order and limited to SPEAKER_LATENT_CACHE_SIZE entries: the app writes a new
+# reference for every video, so an unbounded cache would keep GPU tensors for every video ever processed.
+speaker_latent_instances = OrderedDict()
+SPEAKER_LATENT_CACHE_SIZE = 4
+# Sample rate XTTS conditions on (the load_sr of Xtts.get_conditioning_latents).
+XTTS_CONDITIONING_SAMPLE_RATE = 22050
+# Silence inserted after each sentence (the same pause the TTS Synthesizer adds between sentences).
+SENTENCE_PAUSE_SAMPLES = 10000
+# XTTS sampling settings taken from the model config, as XTTS's own synthesize() does.
+XTTS_INFERENCE_SETTINGS = ("temperature", "length_penalty", "repetition_penalty", "top_k", "top_p")
+
+# Run XTTS in float16 (CUDA autocast) on GPU: roughly halves activation memory and uses tensor cores.
+# Precision-sensitive ops (softmax, layer norm) stay in float32 under autocast.
+XTTS_FP16 = True
+# Replay the XTTS HiFi-GAN decoder from captured CUDA graphs (torch.compile "reduce-overhead"), removing the
+# per-kernel launch overhead of its many small convolutions. Off by default: it needs Triton, and every new
+# length bucket is compiled and captured once (slow first sentences) before it is replayed.
+XTTS_CUDA_GRAPHS = False
+# Decoder inputs are padded to a multiple of this many latent frames, so that a few graphs cover all lengths.
+XTTS_DECODER_BUCKET = 16
+
+class BucketedGraphDecoder(torch.nn.Module):
+    """
+    Wraps the XTTS HiFi-GAN decoder so it runs through torch.compile(mode="reduce-overhead") (CUDA graphs).
+    GPT latents are zero-padded along time to a multiple of bucket_size, so each captured graph is reused
+    for all sentences in its bucket; the waveform of the padding is cut off again.
+    """
+    def __init__(self, decoder, bucket_size=XTTS_DECODER_BUCKET):
+        super().__init__()
+        self.decoder = decoder
+        self.bucket_size = bucket_size
+        self.compiled_decoder = torch.compile(decoder, mode="reduce-overhead", dynamic=False)
+
+    def forward(self, latents, g=None):
+        length = latents.shape[1]
+        padded_length = -(-length // self.bucket_size) * self.bucket_size
+        if padded_length != length:
+            latents = torch.nn.functional.pad(latents, (0, 0, 0, padded_length - length))
+        wav = self.compiled_decoder(latents, g=g)
+        # The output length is proportional to the number of latent frames. Clone it out of the graph's
+        # static output buffer, which is overwritten by the next replay.
+        return wav[..., :wav.shape[-1] * length // padded_length].clone()
+
+    def __getattr__(self, name):
+        try:
+            return super().__getattr__(name)
+        except AttributeError: # Other decoder attributes (e.g. sample rates) are read through the wrapper
+            return getattr(self.decoder, name)
+
 def get_tts_model(language_code, use_cuda=False):
     """
     Initializes and returns a TTS model based on the language code.
@@ -19,9 +88,13 @@ def get_tts_model(language_code, use_cuda=False):
     """
     global tts_model_instance
 
+    # Fast path: the model is loaded once; its files do not need to be checked again.
+    if tts_model_instance is not None:
+        return tts_model_instance
+
     # Determine the device
     device = "cuda" if use_cuda and torch.cuda.is_available() else "cpu"
-    print(f"TTS will use device: {device}")
+    logger.info("TTS will use device: %s", device)
 
     # Map language codes to specific Coqui TTS models
     # This mapping needs to be curated based on available Coqui models
@@ -40,28 +113,30 @@ def get_tts_model(language_code, use_cuda=False):
     # For this example, checking config.json and the directory itself.
     if not os.path.exists(model_path) or not os.path.isdir(model_path):
         error_msg = f"Coqui TTS model directory not found at '{model_path}'. Please check setup instructions."
-        print(error_msg)
+        logger.error(error_msg)
         raise FileNotFoundError(error_msg)
     if not os.path.exists(expected_config_path):
         error_msg = f"Coqui TTS model config file not found at '{expected_config_path}'. Ensure the model is correctly downloaded and placed."
-        print(error_msg)
+        logger.error(error_msg)
         raise FileNotFoundError(error_msg)
     # Check if directory is empty (additional check)
     if not os.listdir(model_path):
          error_msg = f"Coqui TTS model directory '{model_path}' is empty. Please ensure model files are present."
-         print(error_msg)
+         logger.error(error_msg)
          raise FileNotFoundError(error_msg)
 
-
-    if tts_model_instance is None:
-        print(f"Loading TTS model from path: {model_path} for language: {language_code}...")
-        try:
-            tts_model_instance = TTS(model_path=model_path, config_path=expected_config_path, progress_bar=True).to(device)
-            print("TTS model loaded successfully.")
-        except Exception as e:
-            error_msg = f"Error loading Coqui TTS model from '{model_path}': {str(e)}"
-            print(error_msg)
-            raise RuntimeError(error_msg)
+    logger.info("Loading TTS model from path: %s for language: %s...", model_path, language_code)
+    try:
+        tts_model_instance = TTS(model_path=model_path, config_path=expected_config_path, progress_bar=True).to(device)
+        logger.info("TTS model loaded successfully.")
+        xtts_model = tts_model_instance.synthesizer.tts_model
+        if XTTS_CUDA_GRAPHS and device == "cuda" and hasattr(xtts_model, "hifigan_decoder"):
+            logger.info("Enabling CUDA graphs for the XTTS HiFi-GAN decoder...")
+            xtts_model.hifigan_decoder = BucketedGraphDecoder(xtts_model.hifigan_decoder)
+    except Exception as e:
+        error_msg = f"Error loading Coqui TTS model from '{model_path}': {str(e)}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
     # If a model is already loaded, we might need to check if it's compatible
     # with the new language_code or if it needs to be reloaded.
     # For XTTS models, they are often multilingual, so reloading might not be necessary
@@ -72,6 +147,53 @@ def get_tts_model(language_code, use_cuda=False):
 
     return tts_model_instance
 
+def _speaker_file_key(speaker_wav_path):
+    """Identifies a reference recording by path, modification time and size."""
+    return os.path.abspath(speaker_wav_path), os.path.getmtime(speaker_wav_path), os.path.getsize(speaker_wav_path)
+
+def load_speaker_audio(speaker_wav_path, sample_rate, device):
+    """
+    Returns the reference recording as a mono (1, samples) float tensor at sample_rate on device.
+    The tensor is not cached: only get_speaker_latents uses it, and it keeps the latents instead.
+    """
+    wav, file_sample_rate = torchaudio.load(speaker_wav_path)
+    wav = wav.mean(dim=0, keepdim=True)
+    if file_sample_rate != sample_rate:
+        wav = torchaudio.functional.resample(wav, file_sample_rate, sample_rate)
+    return wav.to(device)
+
+def get_speaker_latents(xtts_model, speaker_wav_path):
+    """
+    Returns (gpt_cond_latent, speaker_embedding) for the reference recording, computing them only
+    the first time a given file is used (for the SPEAKER_LATENT_CACHE_SIZE most recently used files). The conditioning uses the tensor from load_speaker_audio
+    and the reference settings from the model config (like XTTS's own synthesize()).
+    """
+    key = _speaker_file_key(speaker_wav_path)
+    if key in speaker_latent_instances:
+        speaker_latent_instances.move_to_end(key)
+    else:
+        logger.info("Computing speaker latents for %s...", speaker_wav_path)
+        config = xtts_model.config
+        max_ref_length = getattr(config, "max_ref_len", 30)
+        gpt_cond_len = getattr(config, "gpt_cond_len", 6)
+        gpt_cond_chunk_len = getattr(config, "gpt_cond_chunk_len", 6)
+        if hasattr(xtts_model, "get_gpt_cond_latents") and hasattr(xtts_model, "get_speaker_embedding"):
+            # Same steps as Xtts.get_conditioning_latents for a single file, starting from the in-memory tensor.
+            audio = load_speaker_audio(speaker_wav_path, XTTS_CONDITIONING_SAMPLE_RATE, xtts_model.device)
+            audio = audio[:, :XTTS_CONDITIONING_SAMPLE_RATE * max_ref_length]
+            speaker_embedding = xtts_model.get_speaker_embedding(audio, XTTS_CONDITIONING_SAMPLE_RATE)
+            gpt_cond_latent = xtts_model.get_gpt_cond_latents(
+                audio, XTTS_CONDITIONING_SAMPLE_RATE, length=gpt_cond_len, chunk_length=gpt_cond_chunk_len
+            )
+            speaker_latent_instances[key] = (gpt_cond_latent, speaker_embedding)
+        else: # Older XTTS versions: let the model load the file itself
+            speaker_latent_instances[key] = xtts_model.get_conditioning_latents(
+                audio_path=[speaker_wav_path], gpt_cond_len=gpt_cond_len, max_ref_length=max_ref_length
+            )
+        while len(speaker_latent_instances) > SPEAKER_LATENT_CACHE_SIZE:
+            speaker_latent_instances.popitem(last=False)
+    return speaker_latent_instances[key]
+
 def synthesize_speech(text, target_lang_code, speaker_wav_path, output_synth_wav_path="synthesized_audio.wav"):
     """
     Synthesizes speech from text using a TTS model, with voice cloning.
@@ -83,44 +205,81 @@ def synthesize_speech(text, target_lang_code, speaker_wav_path, output_synth_wav
         output_synth_wav_path (str): Path to save the synthesized audio.
 
     Returns:
-        str: Path to the synthesized audio file, or None if synthesis fails.
+        str: Path to the synthesized audio file, or None if synthesis fails or the text has nothing to speak.
     """
     if not text:
-        print("Error: No text provided for speech synthesis.")
+        logger.error("Error: No text provided for speech synthesis.")
         return None
     if not os.path.exists(speaker_wav_path):
         error_msg = f"Speaker WAV file not found at {speaker_wav_path} for voice cloning."
-        print(error_msg)
+        logger.error(error_msg)
         raise FileNotFoundError(error_msg)
+    # XTTS generates autoregressively, so one call per sentence keeps each generation (and its
+    # KV cache) short; long transcripts no longer run out of GPU memory.
+    # Sentences without a letter or digit (e.g. a lone "...") have nothing to speak.
+    sentences = [sentence for sentence in split_sentences(text, target_lang_code)
+                 if any(char.isalnum() for char in sentence)]
+    if not sentences:
+        logger.error("Error: No speakable sentences in the text provided for speech synthesis.")
+        return None
 
-    use_cuda = torch.cuda.is_available()
-    try:
-        tts_model = get_tts_model(language_code=target_lang_code, use_cuda=use_cuda)
-    except (FileNotFoundError, RuntimeError) as e: # Catch errors from get_tts_model
-        # These errors are already printed in get_tts_model, re-raise to propagate
-        raise
+    # Calls queue here instead of running the model concurrently (see TTS_CONCURRENT_REQUESTS).
+    with tts_semaphore:
+        use_cuda = torch.cuda.is_available()
+        try:
+            tts_model = get_tts_model(language_code=target_lang_code, use_cuda=use_cuda)
+        except (FileNotFoundError, RuntimeError) as e: # Catch errors from get_tts_model
+            # These errors are already printed in get_tts_model, re-raise to propagate
+            raise
     
-    if tts_model is None: # Should be caught by exceptions in get_tts_model
-        error_msg = "TTS model not available after attempting to load. Cannot synthesize speech."
-        print(error_msg)
-        raise RuntimeError(error_msg) # Should not happen if get_tts_model raises properly
+        if tts_model is None: # Should be caught by exceptions in get_tts_model
+            error_msg = "TTS model not available after attempting to load. Cannot synthesize speech."
+            logger.error(error_msg)
+            raise RuntimeError(error_msg) # Should not happen if get_tts_model raises properly
 
-    try:
-        print(f"Synthesizing speech for text: '{text[:50]}...' in language: '{target_lang_code}'")
-        print(f"Using speaker WAV for voice cloning: {speaker_wav_path}")
-
-        tts_model.tts_to_file(
-            text=text,
-            speaker_wav=speaker_wav_path,
-            language=target_lang_code,
-            file_path=output_synth_wav_path,
-        )
-        print(f"Speech synthesized successfully to {output_synth_wav_path}")
-        return output_synth_wav_path
-    except Exception as e:
-        error_msg = f"Error during Coqui TTS speech synthesis: {str(e)}"
-        print(error_msg)
-        raise RuntimeError(error_msg)
+        try:
+            logger.debug("Synthesizing speech for %s sentence(s): '%s...' in language: '%s'", len(sentences), text[:50], target_lang_code)
+            logger.debug("Using speaker WAV for voice cloning: %s", speaker_wav_path)
+
+            xtts_model = tts_model.synthesizer.tts_model
+            # Each sentence is written to the WAV file as soon as it is generated, so memory use does not grow
+            # with the length of the text.
+            with sf.SoundFile(output_synth_wav_path, "w", samplerate=tts_model.synthesizer.output_sample_rate,
+                              channels=1, subtype="PCM_16") as output_file:
+                # inference_mode skips autograd bookkeeping (no saved activations or version counters).
+                with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16, enabled=XTTS_FP16 and use_cuda):
+                    if hasattr(xtts_model, "get_conditioning_latents"):
+                        # XTTS: condition on the speaker once and generate every sentence from the cached latents,
+                        # instead of re-encoding the reference recording for each sentence.
+                        gpt_cond_latent, speaker_embedding = get_speaker_latents(xtts_model, speaker_wav_path)
+                        inference_settings = {name: getattr(xtts_model.config, name) for name in XTTS_INFERENCE_SETTINGS
+                                              if hasattr(xtts_model.config, name)}
+                        for sentence in sentences:
+                            output = xtts_model.inference(sentence, target_lang_code, gpt_cond_latent, speaker_embedding, **inference_settings)
+                            output_file.write(np.clip(np.asarray(output["wav"], dtype=np.float32), -1.0, 1.0))
+                            output_file.write(np.zeros(SENTENCE_PAUSE_SAMPLES, dtype=np.float32))
+                    else:
+                        for sentence in sentences:
+                            # Each call already ends with a short silence, which separates the sentences.
+                            output_file.write(np.clip(np.asarray(tts_model.tts(
+                                text=sentence,
+                                speaker_wav=speaker_wav_path,
+                                language=target_lang_code,
+                                split_sentences=False,
+                            ), dtype=np.float32), -1.0, 1.0))
+            logger.info("Speech synthesized successfully to %s", output_synth_wav_path)
+            return output_synth_wav_path
+        except Exception as e:
+            error_msg = f"Error during Coqui TTS speech synthesis: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+async def synthesize_speech_async(text, target_lang_code, speaker_wav_path, output_synth_wav_path="synthesized_audio.wav"):
+    """
+    Async version of synthesize_speech: runs it in a worker thread, so waiting for the model
+    (see TTS_CONCURRENT_REQUESTS) and synthesis do not block the event loop.
+    """
+    return await asyncio.to_thread(synthesize_speech, text, target_lang_code, speaker_wav_path, output_synth_wav_path)
 
 def release_tts_models(whisper_model_to_release=None):
     """
@@ -132,33 +291,37 @@ def release_tts_models(whisper_model_to_release=None):
     """
     global tts_model_instance
     if tts_model_instance is not None:
-        print("Releasing TTS model from memory...")
+        logger.info("Releasing TTS model from memory...")
         # How to properly delete a TTS object depends on its internal structure.
         # Often, setting to None and letting Python's garbage collector handle it,
         # along with torch.cuda.empty_cache(), is sufficient.
         del tts_model_instance
         tts_model_instance = None
-        print("TTS model released.")
+        speaker_latent_instances.clear()
+        logger.info("TTS model released.")
 
     if whisper_model_to_release is not None:
-        print("Releasing Whisper model from memory...")
+        logger.info("Releasing Whisper model from memory...")
         del whisper_model_to_release # Assuming whisper_model is passed if loaded elsewhere
-        print("Whisper model released.")
+        logger.info("Whisper model released.")
 
     if torch.cuda.is_available():
-        print("Emptying CUDA cache...")
+        logger.info("Emptying CUDA cache...")
         torch.cuda.empty_cache()
-        print("CUDA cache emptied.")
+        # Start peak statistics afresh, so the next caller sees the memory actually available now.
+        torch.cuda.reset_peak_memory_stats()
+        logger.info("CUDA cache emptied.")
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     # Example Usage (ensure models/tts/xtts_v2 exists and has model files)
     dummy_speaker_wav = "audio.wav" # Reusing from transcription test
     
     if not os.path.exists(dummy_speaker_wav):
         print(f"Warning: Dummy speaker WAV '{dummy_speaker_wav}' not found. Creating one for TTS test.")
         try:
-            subprocess.run([ # Using 24kHz as per our audio pipeline
-                "ffmpeg", "-f", "lavfi", "-i", "anullsrc=channel_layout=mono:sample_rate=24000",
+            subprocess.run([ # Using 16kHz as per our audio pipeline
+                "ffmpeg", "-f", "lavfi", "-i", "anullsrc=channel_layout=mono:sample_rate=16000",
                 "-t", "2", dummy_speaker_wav, "-y"
             ], check=True)
             print(f"Created dummy '{dummy_speaker_wav}'.")
@@ -1,68 +1,193 @@
-import whisper
+import logging
 import os
+import subprocess
+import wave
+import numpy as np
+import torch
+from src.video_processing import TRANSCRIPTION_SAMPLE_RATE
 
-def transcribe_audio(audio_path="audio.wav"):
+try:
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+except ImportError: # Fall back to the original PyTorch implementation (openai-whisper)
+    BatchedInferencePipeline = WhisperModel = None
+    import whisper
+
+logger = logging.getLogger(__name__)
+
+# Directory where faster-whisper stores (or finds) the converted CTranslate2 models.
+# A model converted ahead of time (ct2-transformers-converter) can be placed in models/whisper/<name>-ct2/;
+# it is used instead of downloading one. openai-whisper keeps its .pt checkpoints in the same directory.
+WHISPER_MODELS_DIR = os.path.join("models", "whisper")
+
+# The sidebar exposes the classic Whisper sizes; faster-whisper publishes "large" as versioned checkpoints.
+FASTER_WHISPER_MODEL_NAMES = {
+    "large": "large-v3",
+}
+
+# Default CTranslate2 compute types: int8 weights halve memory bandwidth and use the int8 GEMM
+# kernels (VNNI on x86); on GPU the activations stay in float16.
+DEFAULT_COMPUTE_TYPES = {
+    "cpu": "int8",
+    "cuda": "int8_float16",
+}
+
+# Loaded Whisper models, keyed by (model_size, device, compute_type), so that repeated
+# runs in the same Streamlit session do not reload the model from disk.
+whisper_model_instances = {}
+# Batched pipelines wrapping the models above (same keys).
+batched_pipeline_instances = {}
+
+# Number of ~30 s VAD chunks decoded together in one batch.
+DEFAULT_BATCH_SIZE = 8
+
+def _resolve_model_key(model_name, compute_type=None):
+    """Returns the (model_size, device, compute_type) key used to cache a Whisper model."""
+    # faster-whisper runs the same Whisper weights converted to CTranslate2 format.
+    # The converted model is downloaded into models/whisper/ on first use and reused from there afterwards.
+    model_size = FASTER_WHISPER_MODEL_NAMES.get(model_name, model_name)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return model_size, device, compute_type or DEFAULT_COMPUTE_TYPES[device]
+
+def get_whisper_model(model_name, compute_type=None):
+    """
+    Initializes and returns a faster-whisper model for the given size.
+    Manages a global cache of model instances to avoid reloading.
+
+    Args:
+        model_name (str): Name of the Whisper model to use (e.g., "tiny", "base", "small", "medium", "large").
+        compute_type (str): CTranslate2 compute type (e.g., "int8", "int8_float16", "float16", "float32").
+                            Defaults to the per-device entry of DEFAULT_COMPUTE_TYPES.
+
+    Returns:
+        faster_whisper.WhisperModel: The loaded model (a whisper.Whisper model if faster-whisper is not installed).
+    """
+    model_key = _resolve_model_key(model_name, compute_type)
+    model_size, device, compute_type = model_key
+    if model_key not in whisper_model_instances:
+        try:
+            if WhisperModel is None:
+                logger.info("faster-whisper is not installed. Loading openai-whisper model (%s) on %s...", model_name, device)
+                whisper_model_instances[model_key] = whisper.load_model(model_name, device=device, download_root=WHISPER_MODELS_DIR)
+            else:
+                local_model_dir = os.path.join(WHISPER_MODELS_DIR, f"{model_name}-ct2")
+                model_path = local_model_dir if os.path.isdir(local_model_dir) else model_size
+                logger.info("Loading Whisper model (%s) on %s with compute type '%s'...", model_path, device, compute_type)
+                whisper_model_instances[model_key] = WhisperModel(model_path, device=device, compute_type=compute_type, download_root=WHISPER_MODELS_DIR)
+            logger.info("Whisper model '%s' loaded successfully.", model_size)
+        except Exception as e:
+            error_msg = f"Error loading Whisper model '{model_size}' into {WHISPER_MODELS_DIR}: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    return whisper_model_instances[model_key]
+
+def get_batched_pipeline(model_name, compute_type=None):
     """
-    Transcribes the given audio file using Whisper.
+    Returns a faster_whisper.BatchedInferencePipeline around the cached model for model_name.
+    The pipeline splits the audio into VAD chunks and decodes several chunks per forward pass.
+    """
+    model_key = _resolve_model_key(model_name, compute_type)
+    if model_key not in batched_pipeline_instances:
+        batched_pipeline_instances[model_key] = BatchedInferencePipeline(model=get_whisper_model(model_name, compute_type))
+    return batched_pipeline_instances[model_key]
+
+def release_whisper_models():
+    """
+    Releases all cached Whisper models (and the batched pipelines wrapping them) from memory.
+    Also clears the CUDA cache if PyTorch is using CUDA.
+    """
+    if whisper_model_instances:
+        logger.info("Releasing Whisper models from memory...")
+        # CTranslate2 frees a model's memory as soon as the last reference to it is dropped.
+        batched_pipeline_instances.clear()
+        whisper_model_instances.clear()
+        logger.info("Whisper models released.")
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def load_whisper_ready_wav(audio_path):
+    """
+    Loads a 16kHz mono 16-bit PCM WAV file (the format produced by extract_audio) as a float32 array.
+    Whisper consumes exactly this format, so the samples can be passed to the model without
+    decoding or resampling the file again.
+
+    Returns:
+        numpy.ndarray: Samples scaled to [-1, 1], or None if the file is in any other format.
+    """
+    try:
+        with wave.open(audio_path, "rb") as wav_file:
+            if wav_file.getframerate() != TRANSCRIPTION_SAMPLE_RATE or wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                return None
+            frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+def transcribe_audio(audio_path="audio.wav", model_name="medium", compute_type=None, batch_size=DEFAULT_BATCH_SIZE, beam_size=1):
+    """
+    Transcribes the given audio (file or samples) using Whisper (faster-whisper / CTranslate2 backend, or openai-whisper
+    if faster-whisper is not installed).
 
     Args:
-        audio_path (str): Path to the audio file.
+        audio_path (str or numpy.ndarray): Path to the audio file, or 16kHz mono float32 samples
+                                           (e.g. from video_processing.extract_audio_inmemory).
         model_name (str): Name of the Whisper model to use (e.g., "tiny", "base", "small", "medium", "large").
+        compute_type (str): Optional CTranslate2 compute type override (see get_whisper_model).
+        batch_size (int): Number of audio chunks decoded together. Values <= 1 use sequential decoding.
+        beam_size (int): Beam width. 1 (greedy decoding) is several times cheaper than a wide beam and
+                         rarely less accurate with VAD-segmented audio.
 
     Returns:
         tuple: (transcribed_text, detected_language)
                Returns (None, None) if transcription fails.
     """
-    if not os.path.exists(audio_path):
-        print(f"Error: Audio file not found at {audio_path}")
+    from_samples = isinstance(audio_path, np.ndarray)
+    if not from_samples and not os.path.exists(audio_path):
+        logger.error("Error: Audio file not found at %s", audio_path)
         return None, None
 
-    # Model path is constructed based on the model_name parameter.
-    # User is expected to download the model (e.g., "medium.pt") and place it in "models/whisper/"
-    model_filename = f"{model_name}.pt"
-    model_download_path = os.path.join("models", "whisper", model_filename) # Path where user downloads .pt file
-    
-    # Whisper's load_model can take the name directly (e.g., "medium") and it will download if not found in default cache,
-    # or it can take the path to a .pt file.
-    # To use our local "models/whisper/" directory as the primary source:
-    # We'll pass the path if the file exists there, otherwise, we can let Whisper try to download to its cache
-    # by passing just the model_name, or handle it more strictly.
-    # For this implementation, we'll require the .pt file to be in our designated models/whisper/ directory.
-
-    if not os.path.exists(model_download_path):
-        error_msg = f"Whisper model file '{model_filename}' not found at {model_download_path}. Please check setup instructions."
-        print(f"Error: {error_msg}")
-        raise FileNotFoundError(error_msg)
-
-    print(f"Loading Whisper model ({model_name})...")
-    try:
-        model = whisper.load_model(model_download_path)
-        print(f"Whisper model '{model_name}' loaded successfully from {model_download_path}.")
-    except Exception as e:
-        error_msg = f"Error loading Whisper model '{model_name}' from {model_download_path}: {str(e)}"
-        print(error_msg)
-        raise RuntimeError(error_msg)
-    
+    if WhisperModel is None:
+        model = get_whisper_model(model_name)
+    elif batch_size and batch_size > 1:
+        model = get_batched_pipeline(model_name, compute_type=compute_type)
+        transcribe_options = {"batch_size": batch_size} # VAD chunking is always on for the batched pipeline
+    else:
+        model = get_whisper_model(model_name, compute_type=compute_type)
+        transcribe_options = {"vad_filter": True}
+
     try:
-        print(f"Starting transcription for {audio_path}...")
-        result = model.transcribe(audio_path)
-        transcribed_text = result["text"]
-        detected_language = result["language"]
-        print(f"Transcription complete. Detected language: {detected_language}")
+        if from_samples:
+            logger.info("Starting transcription of %.1fs of in-memory audio...", len(audio_path) / TRANSCRIPTION_SAMPLE_RATE)
+            audio = audio_path.astype(np.float32, copy=False)
+        else:
+            logger.info("Starting transcription for %s...", audio_path)
+            audio = load_whisper_ready_wav(audio_path)
+            if audio is None: # Not already 16kHz mono PCM; let Whisper decode and resample the file
+                audio = audio_path
+        if WhisperModel is None:
+            # openai-whisper decodes greedily when beam_size is None.
+            with torch.inference_mode():
+                result = model.transcribe(audio, beam_size=beam_size if beam_size > 1 else None, fp16=torch.cuda.is_available())
+            logger.info("Transcription complete. Detected language: %s", result['language'])
+            return result["text"].strip(), result["language"]
+        # Segments are yielded lazily; transcription actually runs while they are consumed.
+        segments, info = model.transcribe(audio, beam_size=beam_size, **transcribe_options)
+        # Batched chunks are stitched back together in timestamp order.
+        segments = sorted(segments, key=lambda segment: segment.start)
+        transcribed_text = "".join(segment.text for segment in segments).strip()
+        detected_language = info.language
+        logger.info("Transcription complete. Detected language: %s", detected_language)
         # print(f"Transcribed text: {transcribed_text}") # Can be very long
-
-        # Clean up the model (optional, managed globally or per-session in a real app)
-        # del model
-        # if torch.cuda.is_available(): torch.cuda.empty_cache()
         return transcribed_text, detected_language
     except Exception as e:
         error_msg = f"Error during audio transcription with Whisper model '{model_name}': {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         raise RuntimeError(error_msg)
 
 if __name__ == '__main__':
-    # Example usage (requires a dummy audio.wav file and models downloaded)
-    # Ensure `models/whisper/medium.pt` (or other selected model) exists for this example.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Example usage (requires a dummy audio.wav file; the model is downloaded to models/whisper/ if missing)
     dummy_audio_file = "audio.wav"
     selected_model_name = "medium" # or "base", "tiny" if available
 
@@ -70,30 +195,23 @@ if __name__ == '__main__':
         try:
             print(f"Creating dummy '{dummy_audio_file}' for testing...")
             subprocess.run([
-                "ffmpeg", "-f", "lavfi", "-i", f"anullsrc=channel_layout=mono:sample_rate=24000", # Using 24kHz like our main pipeline
+                "ffmpeg", "-f", "lavfi", "-i", f"anullsrc=channel_layout=mono:sample_rate=16000", # Using 16kHz like our main pipeline
                 "-t", "2", dummy_audio_file, "-y"
             ], check=True)
             print(f"'{dummy_audio_file}' created.")
         except Exception as e:
             print(f"Could not create dummy '{dummy_audio_file}': {e}. Please provide an audio file for testing.")
-    
+
     if os.path.exists(dummy_audio_file):
         print(f"\n--- Testing transcription with '{selected_model_name}' model ---")
         try:
-            # Construct path to the model file for the test
-            model_file_path_for_test = os.path.join("models", "whisper", f"{selected_model_name}.pt")
-            if not os.path.exists(model_file_path_for_test):
-                print(f"Test SKIPPED: Model file {model_file_path_for_test} not found for testing.")
+            text, lang = transcribe_audio(dummy_audio_file, model_name=selected_model_name)
+            if text is not None and lang is not None: # Check for None, as empty string is a valid transcription
+                print(f"Successfully transcribed '{dummy_audio_file}'")
+                print(f"Language: {lang}")
+                print(f"Text: '{text}'")
             else:
-                text, lang = transcribe_audio(dummy_audio_file, model_name=selected_model_name)
-                if text is not None and lang is not None: # Check for None, as empty string is a valid transcription
-                    print(f"Successfully transcribed '{dummy_audio_file}'")
-                    print(f"Language: {lang}")
-                    print(f"Text: '{text}'")
-                else:
-                    print(f"Transcription test failed or returned None for '{dummy_audio_file}'.")
-        except FileNotFoundError as fnf_error:
-            print(f"Test FAILED: {fnf_error}")
+                print(f"Transcription test failed or returned None for '{dummy_audio_file}'.")
         except RuntimeError as rt_error:
             print(f"Test FAILED: {rt_error}")
         except Exception as ex:
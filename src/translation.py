@@ -1,23 +1,161 @@
-from googletrans import Translator, LANGUAGES
-from src.utils import language_mapping # Assuming utils.py is in the same directory
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from src.utils import language_mapping, split_sentences # Assuming utils.py is in the same directory
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of sentence translation requests in flight at once.
+MAX_CONCURRENT_TRANSLATIONS = 16
+
+class TranslationError(RuntimeError):
+    """Raised when the translation service fails; the original error is chained as __cause__."""
+
+@lru_cache(maxsize=None)
+def _valid_target_langs():
+    """Every target code known to be valid, built once for a single membership test."""
+    from googletrans import LANGUAGES
+    return frozenset(language_mapping) | frozenset(LANGUAGES)
+
+# Shared Translator instance, created on first use. It keeps one HTTP client (and its open connections)
+# for all translations; the client is thread-safe, so concurrent sentence requests can share it.
+# googletrans is only imported at that point: importing it (and httpx) takes ~0.1 s, which callers
+# that never reach a request (empty text, same language) should not pay.
+_translator = None
+_translator_lock = threading.Lock()
+
+def _get_translator():
+    """Returns the shared googletrans Translator, creating it on first use."""
+    global _translator
+    if _translator is None:
+        # Worker threads may ask for the Translator at the same time; only one of them creates it.
+        with _translator_lock:
+            if _translator is None:
+                from googletrans import Translator as _Translator
+                logger.info("Initializing Google Translator...")
+                _translator = _Translator()
+    return _translator
+
+@lru_cache(maxsize=4096)
+def _translate_cached(text, src, dest):
+    """Translates one piece of text, memoizing the result (repeated sentences cost no request)."""
+    return _get_translator().translate(text, src=src, dest=dest).text
+
+def clear_translation_cache():
+    """Drops all memoized translations (e.g. to free memory or to start a test from a clean state)."""
+    _translate_cached.cache_clear()
+
+def _translation_error_message(error, src_lang_code, target_lang_code):
+    """Builds the error message for a failed translation, with hints for common googletrans failures."""
+    error_message = f"Error during translation from '{src_lang_code}' to '{target_lang_code}': {str(error)}. "
+    if "invalid source language" in str(error).lower():
+        error_message += f"The source language code '{src_lang_code}' might be invalid or unsupported. "
+    if "invalid destination language" in str(error).lower():
+         error_message += f"The target language code '{target_lang_code}' might be invalid or unsupported. Check `googletrans.LANGUAGES`. "
+    # Add a note about potential network issues for common errors like 'AttributeError: 'NoneType' object has no attribute 'group''
+    if "'NoneType' object has no attribute 'group'" in str(error) or "HTTPError 503" in str(error): # Common with googletrans if service is unavailable or rate limited
+        error_message += "This might be due to network issues or the translation service being temporarily unavailable. Please try again later."
+    return error_message
+
+# Target languages written without spaces between sentences.
+NO_SPACE_TARGET_LANGS = frozenset({"ja", "zh-cn", "zh-tw", "th"})
+
+def _split_for_translation(text, src_lang_code):
+    """
+    Returns (pieces, separators): the pieces text is translated in (its sentences, or the whole text if it
+    is a single sentence) and the whitespace that followed each piece but the last in the source text.
+    """
+    if not text:
+        return [], []
+    sentences = split_sentences(text, src_lang_code)
+    if len(sentences) <= 1:
+        return [text], []
+    separators = []
+    position = 0
+    for sentence, next_sentence in zip(sentences, sentences[1:]):
+        start = text.find(sentence, position)
+        end = start + len(sentence) if start >= 0 else position
+        position = text.find(next_sentence, end)
+        if position < 0: # Not found verbatim (a segmenter that rewrites text); fall back to a space
+            separators.append(" ")
+            position = end
+        else:
+            separators.append(text[end:position])
+    return sentences, separators
+
+def _join_translations(pieces, separators, translations, target_lang_code):
+    """
+    Joins the translations of pieces, keeping the source's line breaks between sentences. Other separators
+    become the target language's own: a space, or nothing for languages written without spaces.
+    """
+    inline_separator = "" if target_lang_code.lower() in NO_SPACE_TARGET_LANGS else " "
+    translated_text = translations[pieces[0]] if pieces else ""
+    for separator, piece in zip(separators, pieces[1:]):
+        translated_text += (separator if "\n" in separator else inline_separator) + translations[piece]
+    return translated_text
+
+def _translate_pieces(pieces, src_lang_code, target_lang_code):
+    """
+    Translates each distinct piece once, concurrently, and returns a {piece: translation} dict.
+    Repeated pieces are requested once; concurrent misses would not share the cache.
+    """
+    unique_pieces = list(dict.fromkeys(pieces))
+    if len(unique_pieces) <= 1:
+        return {piece: _translate_cached(piece, src_lang_code, target_lang_code) for piece in unique_pieces}
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_TRANSLATIONS, len(unique_pieces))) as executor:
+        return dict(zip(unique_pieces, executor.map(
+            lambda piece: _translate_cached(piece, src_lang_code, target_lang_code),
+            unique_pieces,
+        )))
+
+def _prepare_translation(texts, src_lang_code, target_lang_code):
+    """
+    Checks the target language code, creates the shared Translator and splits each text for translation.
+    Returns one (pieces, separators) pair per text, as _split_for_translation does.
+    """
+    if target_lang_code not in _valid_target_langs():
+         # Check if the target_lang_code is a direct key in googletrans.LANGUAGES (e.g. 'zh-cn')
+        logger.warning("Target language code '%s' not in predefined language_mapping or googletrans.LANGUAGES.", target_lang_code)
+        # Attempt to use it directly if it's a valid code for googletrans
+        # No specific validation here, googletrans will raise an error if it's invalid.
+
+    _get_translator()
+    return [_split_for_translation(item, src_lang_code) for item in texts]
 
 def translate_text(text, src_lang_code, target_lang_code):
     """
     Translates text from a source language to a target language.
 
     Args:
-        text (str): The text to translate.
+        text (str or list): The text to translate, or a list of texts (e.g. captions) to translate
+                            together in one concurrent batch.
         src_lang_code (str): The language code of the source text (e.g., 'en' for English).
                                This should be a code recognized by Whisper.
         target_lang_code (str): The language code for the target language (e.g., 'es' for Spanish).
-                                This should be a key from `language_mapping`.
+                                This should be a key from `language_mapping` (pass the key itself rather
+                                than a re-typed user string).
 
     Returns:
-        str: The translated text, or None if translation fails.
+        str or list: The translated text, or a list of translations in input order for a list
+                     (the input unchanged if both languages are the same).
+
+    Raises:
+        RuntimeError: If no text is provided.
+        TranslationError: If the translation service fails.
     """
-    if not text:
-        print("Error: No text provided for translation.")
-        return None
+    is_batch = isinstance(text, (list, tuple))
+    if not text or (is_batch and not any(text)):
+        error_msg = "Error: No text provided for translation."
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+
+    # str equality already short-circuits on identity, so codes taken from language_mapping keys
+    # (as the app does) take this path without a character comparison.
+    if src_lang_code == target_lang_code:
+        logger.info("Source and target language are both '%s'. Skipping translation.", src_lang_code)
+        return list(text) if is_batch else text
 
     # Ensure the source language code from Whisper is compatible with Google Translate
     # Whisper might return 'zh-cn', Google Translate expects 'zh-CN' or just 'zh'
@@ -31,39 +169,73 @@ def translate_text(text, src_lang_code, target_lang_code):
     # or if we need to display the full language name.
     # For the Translator, we use the target_lang_code directly.
 
-    if target_lang_code not in language_mapping and target_lang_code not in LANGUAGES:
-         # Check if the target_lang_code is a direct key in googletrans.LANGUAGES (e.g. 'zh-cn')
-        print(f"Warning: Target language code '{target_lang_code}' not in predefined language_mapping or googletrans.LANGUAGES.")
-        # Attempt to use it directly if it's a valid code for googletrans
-        # No specific validation here, googletrans will raise an error if it's invalid.
-
-    print(f"Initializing Google Translator...")
-    translator = Translator()
-    
-    print(f"Attempting to translate from '{src_lang_code}' to '{target_lang_code}'...")
+    # Sentences are translated independently, so a long transcript (or a batch of captions) is sent as
+    # concurrent per-sentence requests: the total time is close to the slowest request rather than the sum.
+    pieces_per_text = _prepare_translation(list(text) if is_batch else [text], src_lang_code, target_lang_code)
+    logger.info("Attempting to translate %s sentence(s) from '%s' to '%s'...", sum(len(pieces) for pieces, _ in pieces_per_text), src_lang_code, target_lang_code)
     try:
         # Perform the translation
-        translation_result = translator.translate(text, src=src_lang_code, dest=target_lang_code)
-        translated_text = translation_result.text
-        
+        translations = _translate_pieces([piece for pieces, _ in pieces_per_text for piece in pieces], src_lang_code, target_lang_code)
+        translated_texts = [_join_translations(pieces, separators, translations, target_lang_code) for pieces, separators in pieces_per_text]
+        translated_text = translated_texts if is_batch else translated_texts[0]
+
         # print(f"Original text ({src_lang_code}): {text}") # Can be long
         # print(f"Translated text ({target_lang_code}): {translated_text}") # Can be long
-        print(f"Translation successful from '{src_lang_code}' to '{target_lang_code}'.")
+        logger.info("Translation successful from '%s' to '%s'.", src_lang_code, target_lang_code)
         return translated_text
     except Exception as e:
-        error_message = f"Error during translation from '{src_lang_code}' to '{target_lang_code}': {str(e)}. "
-        if "invalid source language" in str(e).lower():
-            error_message += f"The source language code '{src_lang_code}' might be invalid or unsupported. "
-        if "invalid destination language" in str(e).lower():
-             error_message += f"The target language code '{target_lang_code}' might be invalid or unsupported. Check `googletrans.LANGUAGES`. "
-        # Add a note about potential network issues for common errors like 'AttributeError: 'NoneType' object has no attribute 'group''
-        if "'NoneType' object has no attribute 'group'" in str(e) or "HTTPError 503" in str(e): # Common with googletrans if service is unavailable or rate limited
-            error_message += "This might be due to network issues or the translation service being temporarily unavailable. Please try again later."
-
-        print(error_message)
-        raise RuntimeError(error_message)
+        error_message = _translation_error_message(e, src_lang_code, target_lang_code)
+        logger.error(error_message)
+        raise TranslationError(error_message) from e
+
+def translate_if_needed(text, src_lang_code, target_lang_code):
+    """
+    Returns text unchanged if both languages are the same, otherwise translate_text(text, ...).
+    Preferred for call sites where the text is usually already in the target language.
+    """
+    if src_lang_code == target_lang_code:
+        return text
+    return translate_text(text, src_lang_code, target_lang_code)
+
+async def translate_text_async(text, src_lang_code, target_lang_code):
+    """
+    Async version of translate_text for callers running an event loop; like translate_text it accepts
+    a str or a list of texts and returns the same shape. All sentences are requested concurrently with asyncio.gather (at most MAX_CONCURRENT_TRANSLATIONS
+    in flight), so the total time is close to the slowest request. The googletrans import, Translator creation,
+    sentence segmentation and requests all run in worker threads, so the event loop is never blocked.
+    Uses the same shared Translator and result cache as translate_text.
+    """
+    is_batch = isinstance(text, (list, tuple))
+    if not text or (is_batch and not any(text)) or src_lang_code == target_lang_code:
+        return translate_text(text, src_lang_code, target_lang_code) # Raises or returns the text without a request
+
+    pieces_per_text = await asyncio.to_thread(
+        _prepare_translation, list(text) if is_batch else [text], src_lang_code, target_lang_code
+    )
+    sentences = [piece for pieces, _ in pieces_per_text for piece in pieces]
+    logger.info("Attempting to translate %s sentence(s) from '%s' to '%s'...", len(sentences), src_lang_code, target_lang_code)
+    request_slots = asyncio.Semaphore(MAX_CONCURRENT_TRANSLATIONS)
+
+    async def translate_sentence(sentence):
+        async with request_slots:
+            # googletrans is synchronous; each request runs in a worker thread.
+            return await asyncio.to_thread(_translate_cached, sentence, src_lang_code, target_lang_code)
+
+    try:
+        unique_sentences = list(dict.fromkeys(sentences))
+        translated_sentences = dict(zip(unique_sentences, await asyncio.gather(
+            *(translate_sentence(sentence) for sentence in unique_sentences)
+        )))
+    except Exception as e:
+        error_message = _translation_error_message(e, src_lang_code, target_lang_code)
+        logger.error(error_message)
+        raise TranslationError(error_message) from e
+    logger.info("Translation successful from '%s' to '%s'.", src_lang_code, target_lang_code)
+    translated_texts = [_join_translations(pieces, separators, translated_sentences, target_lang_code) for pieces, separators in pieces_per_text]
+    return translated_texts if is_batch else translated_texts[0]
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     # Example Usage
     sample_text_en = "Hello, how are you today?"
     detected_lang_en = "en" # Simulate Whisper's output
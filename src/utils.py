@@ -1,6 +1,21 @@
 import re
+import string
+from types import MappingProxyType
 
-language_mapping = {
+try:
+    import pysbd # Optional: rule-based sentence segmentation (handles abbreviations, decimals, quotes, ...)
+except ImportError:
+    pysbd = None
+
+try:
+    import pyarrow as pa # Optional: vectorized validation of many links at once
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+# Read-only: the mapping is shared module state and must not be changed at runtime.
+language_mapping = MappingProxyType({
     "en": "english",
     "es": "spanish",
     "fr": "french",
@@ -18,14 +33,63 @@ language_mapping = {
     "hu": "hungarian",
     "ko": "korean"
     # Add more as needed, ensure codes are compatible between Whisper and target services
-}
+})
+
+# Sentence boundaries: whitespace after ., ! or ?, or directly after CJK full-width end punctuation.
+# Used when pysbd is not installed or does not support the language.
+SENTENCE_BOUNDARY_REGEX = r"(?<=[.!?])\s+|(?<=[。！？])"
+
+# pysbd segmenters by language code (None for languages pysbd does not support).
+sentence_segmenter_instances = {}
+
+def _get_sentence_segmenter(language_code):
+    """Returns a cached pysbd.Segmenter for the language (e.g. 'en', 'zh-cn'), or None if unavailable."""
+    if pysbd is None or not language_code:
+        return None
+    language = language_code.split("-")[0].lower()
+    if language not in sentence_segmenter_instances:
+        try:
+            sentence_segmenter_instances[language] = pysbd.Segmenter(language=language, clean=False)
+        except ValueError: # Language not supported by pysbd
+            sentence_segmenter_instances[language] = None
+    return sentence_segmenter_instances[language]
 
-# YouTube link validation
-YOUTUBE_LINK_REGEX = r"^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[^&\s]+$"
+def split_sentences(text, language_code="en"):
+    """
+    Splits text into sentences, with pysbd if it is installed and supports the language,
+    otherwise on end-of-sentence punctuation.
+    Args:
+        text (str): The text to split.
+        language_code (str): Language of the text (e.g., 'en', 'es', 'zh-cn').
+    Returns:
+        list: Non-empty, stripped sentences (an empty list for empty text).
+    """
+    if not text:
+        return []
+    segmenter = _get_sentence_segmenter(language_code)
+    if segmenter is not None:
+        sentences = segmenter.segment(text)
+    else:
+        sentences = re.split(SENTENCE_BOUNDARY_REGEX, text)
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+# YouTube link validation by plain string checks (no regex engine): an optional scheme, a known
+# host/path prefix, a video id of letters, digits, "_" or "-", then optional query parameters
+# such as "&t=60s" or a share link's "?si=...".
+_YT_SCHEMES = ("https://", "http://")
+_YT_HOST_PREFIXES = ("youtube.com/watch?v=", "www.youtube.com/watch?v=", "youtu.be/", "www.youtu.be/")
+_YT_ID_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+_YT_ID_MAX_LENGTH = 20 # Video ids are 11 characters; anything much longer is not a video link
+# The same rules as a single RE2 pattern, for pyarrow's vectorized match kernel. RE2's \s only covers
+# ASCII whitespace, so the query class also excludes every other character str.isspace() accepts.
+_YT_LINK_PATTERN = (
+    r"^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[A-Za-z0-9_-]{1,20}"
+    r"([?&][^\s\x0b\x1c-\x1f\x85\p{Z}]*)?$"
+)
 
 def is_valid_youtube_link(link):
     """
-    Validates a YouTube link using a regex pattern.
+    Validates a YouTube link (youtube.com/watch?v=<id> or youtu.be/<id>).
     Args:
         link (str): The YouTube link to validate.
     Returns:
@@ -33,4 +97,37 @@ def is_valid_youtube_link(link):
     """
     if not link: # Ensure link is not None or empty before matching
         return False
-    return bool(re.match(YOUTUBE_LINK_REGEX, link))
+    rest = link
+    for scheme in _YT_SCHEMES:
+        if rest.startswith(scheme):
+            rest = rest[len(scheme):]
+            break
+    for prefix in _YT_HOST_PREFIXES:
+        if rest.startswith(prefix):
+            rest = rest[len(prefix):]
+            break
+    else:
+        return False
+    id_end = len(rest)
+    for separator in "?&":
+        index = rest.find(separator)
+        if index != -1 and index < id_end:
+            id_end = index
+    video_id, query = rest[:id_end], rest[id_end:]
+    if not 0 < len(video_id) <= _YT_ID_MAX_LENGTH or not _YT_ID_CHARS.issuperset(video_id):
+        return False
+    return not any(char.isspace() for char in query)
+
+def is_valid_youtube_link_batch(links):
+    """
+    Validates many YouTube links at once, e.g. a pasted list or a CSV column.
+    Uses a single pyarrow regex kernel over the whole column if pyarrow is installed.
+    Args:
+        links (list or pyarrow.Array): The links to validate (None entries are invalid).
+    Returns:
+        list: One bool per link, True if the link is valid.
+    """
+    if pc is None:
+        return [is_valid_youtube_link(link) for link in links]
+    links = links if isinstance(links, pa.Array) else pa.array(links, type=pa.string())
+    return pc.match_substring_regex(links, _YT_LINK_PATTERN).fill_null(False).to_pylist()
@@ -1,7 +1,17 @@
+import logging
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import re
-import youtube_dl
+import shutil
+import yt_dlp
+
+try:
+    import PyNvVideoCodec as nvc # Optional: in-process NVDEC/NVENC transcoding on NVIDIA GPUs
+except ImportError:
+    nvc = None
+
+logger = logging.getLogger(__name__)
 
 def upload_video(video_path):
     """
@@ -9,114 +19,445 @@ def upload_video(video_path):
     This will be adapted for Streamlit's file uploader.
     """
     # In a Streamlit app, this would use st.file_uploader
-    print("Placeholder: Implement video upload with Streamlit's file_uploader")
+    logger.info("Placeholder: Implement video upload with Streamlit's file_uploader")
     if video_path and os.path.exists(video_path):
         return video_path
     return None
 
-def download_youtube_video(youtube_url, output_path="downloaded_video.mp4"):
-    """Downloads a video from YouTube."""
+def _youtube_download_options(output_path=None):
+    """Builds the yt-dlp options shared by the metadata probe and the download."""
     ydl_opts = {
-        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-        'outtmpl': output_path,
+        # Prefer MP4/M4A so the merge is a plain remux; never fetch more than 1080p (the pipeline downsizes anyway).
+        'format': 'bv*[height<=1080][ext=mp4]+ba[ext=m4a]/bv*[height<=1080]+ba/b[height<=1080]/b',
+        'merge_output_format': 'mp4',
         'retries': 10,
-        'socket_timeout': 300,
+        'fragment_retries': 10,
         'quiet': True,
         'no_warnings': True,
         'nocheckcertificate': True, # To potentially bypass some SSL issues if they arise
+        # Fetch DASH/HLS fragments in parallel instead of one after another.
+        'concurrent_fragment_downloads': 16,
     }
+    if output_path:
+        ydl_opts['outtmpl'] = output_path
+    if shutil.which("aria2c"):
+        # aria2c opens several connections per file, which also speeds up single-file (non-fragmented) downloads.
+        ydl_opts['external_downloader'] = {'default': 'aria2c'}
+        ydl_opts['external_downloader_args'] = {'aria2c': ['-x16', '-s16', '-k1M']}
+    return ydl_opts
+
+def get_youtube_video_info(youtube_url):
+    """
+    Fetches the metadata of a YouTube video (including the formats that will be downloaded) without downloading it.
+    The result can be passed to download_youtube_video to avoid resolving the URL twice.
+    """
     try:
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([youtube_url])
+        with yt_dlp.YoutubeDL(_youtube_download_options()) as ydl:
+            return ydl.extract_info(youtube_url, download=False)
+    except Exception as e:
+        error_message = f"Failed to fetch YouTube video information from {youtube_url}. Error: {str(e)}. Please check the link and your internet connection."
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+def estimate_download_size(video_info):
+    """Returns the expected download size in bytes for the formats selected in video_info, or None if unknown."""
+    requested_formats = video_info.get('requested_formats') or [video_info]
+    sizes = [fmt.get('filesize') or fmt.get('filesize_approx') for fmt in requested_formats]
+    if not all(sizes):
+        return None
+    return sum(sizes)
+
+def download_youtube_video(youtube_url, output_path="downloaded_video.mp4", video_info=None):
+    """
+    Downloads a video from YouTube.
+    If video_info (from get_youtube_video_info) is given, the already resolved metadata is reused.
+    """
+    ydl_opts = _youtube_download_options(output_path)
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if video_info is not None:
+                ydl.process_ie_result(video_info, download=True)
+            else:
+                ydl.download([youtube_url])
     except Exception as e:
         error_message = f"Failed to download YouTube video from {youtube_url}. Error: {str(e)}. Please check the link and your internet connection."
-        print(error_message)
+        logger.error(error_message)
         raise ValueError(error_message)
     return output_path
 
-def resize_video(video_path, output_path="resized_video.mp4", target_width=720, target_height=720):
-    """Resizes a video to the target width and height using ffmpeg."""
+# Leading options for every ffmpeg run: no banner, no per-frame progress stats, only errors on stderr.
+# Keeps the captured stderr small and makes it a usable error message when a command fails.
+FFMPEG_QUIET_ARGS = ["-hide_banner", "-loglevel", "error", "-nostats"]
+# The same for ffprobe (which has no progress stats).
+FFPROBE_QUIET_ARGS = ["-hide_banner", "-v", "error"]
+
+# Sample rate of the audio given to Whisper (its native input rate).
+TRANSCRIPTION_SAMPLE_RATE = 16000
+# Sample rate of the speaker reference for XTTS voice cloning: the rate XTTS conditions on
+# (XTTS_CONDITIONING_SAMPLE_RATE in speech_synthesis), so it keeps the voice above 8kHz.
+SPEAKER_REFERENCE_SAMPLE_RATE = 22050
+
+# Cached result of probing ffmpeg for the NVENC H.264 encoder (None until first probed).
+_nvenc_available = None
+
+def is_nvenc_available():
+    """
+    Checks once whether the local ffmpeg build provides the h264_nvenc encoder.
+    The result is cached for the lifetime of the process.
+    """
+    global _nvenc_available
+    if _nvenc_available is None:
+        try:
+            probe = subprocess.run(["ffmpeg", *FFMPEG_QUIET_ARGS, "-encoders"], capture_output=True, text=True, check=False)
+            _nvenc_available = probe.returncode == 0 and "h264_nvenc" in probe.stdout
+        except FileNotFoundError:
+            _nvenc_available = False
+        logger.info("ffmpeg h264_nvenc encoder available: %s", _nvenc_available)
+    return _nvenc_available
+
+# Cached result of probing for CUDA (NVDEC) decoding support in ffmpeg (None until first probed).
+_cuda_hwaccel_available = None
+
+def _ffmpeg_hwaccel_args():
+    """
+    Returns the ffmpeg input options for hardware (NVDEC) decoding, or [] if ffmpeg was built without
+    CUDA support or no CUDA GPU is present. The probe runs once per process.
+    Decoded frames are copied back to system memory, so the usual CPU filters (scale, pad) still apply.
+    """
+    global _cuda_hwaccel_available
+    if _cuda_hwaccel_available is None:
+        import torch
+        try:
+            probe = subprocess.run(["ffmpeg", *FFMPEG_QUIET_ARGS, "-hwaccels"], capture_output=True, text=True, check=False)
+            _cuda_hwaccel_available = torch.cuda.is_available() and probe.returncode == 0 and "cuda" in probe.stdout.split()
+        except FileNotFoundError:
+            _cuda_hwaccel_available = False
+        logger.info("ffmpeg CUDA hardware decoding available: %s", _cuda_hwaccel_available)
+    return ["-hwaccel", "cuda"] if _cuda_hwaccel_available else []
+
+def _disable_ffmpeg_gpu():
+    """Turns off NVDEC decoding and NVENC encoding for the rest of the process (after a failed GPU run)."""
+    global _nvenc_available, _cuda_hwaccel_available
+    _nvenc_available = False
+    _cuda_hwaccel_available = False
+
+def get_video_encoder_args():
+    """Returns the ffmpeg video encoder arguments: NVENC when available, otherwise libx264."""
+    if is_nvenc_available():
+        return ["-c:v", "h264_nvenc", "-preset", "p4", "-b:v", "6M"]
+    return ["-c:v", "libx264", "-preset", "veryfast"]
+
+def _probe_dimensions_and_duration(video_path):
+    """
+    Returns (width, height, duration) of a video: the first video stream's size and the container
+    duration in seconds (None if ffprobe cannot tell).
+    """
+    cmd_probe = [
+        "ffprobe", *FFPROBE_QUIET_ARGS, "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=duration", "-of", "default=noprint_wrappers=1", video_path
+    ]
+    process = subprocess.run(cmd_probe, capture_output=True, text=True, check=False)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe failed to get video dimensions. Error: {process.stderr}")
+    fields = dict(line.split("=", 1) for line in process.stdout.splitlines() if "=" in line)
+    try:
+        duration = float(fields.get("duration", ""))
+    except ValueError: # "N/A" for some streams/containers
+        duration = None
+    return int(fields["width"]), int(fields["height"]), duration
+
+def resize_video(video_path, output_path="resized_video.mp4", target_width=720, target_height=720, max_duration=60):
+    """
+    Resizes a video to the target width and height using ffmpeg.
+    Decoding uses NVDEC and encoding NVENC when available, otherwise the CPU (libx264).
+    If max_duration is given, only the first max_duration seconds (video and audio) are kept; the cut is
+    made on the input (-t before -i), the same way as in resize_and_extract and extract_audio.
+    """
     # Check if video dimensions are already as desired
     try:
-        cmd_probe = [
-            "ffprobe", "-v", "error", "-select_streams", "v:0",
-            "-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", video_path
-        ]
-        process = subprocess.run(cmd_probe, capture_output=True, text=True, check=False)
-        if process.returncode != 0:
-            raise RuntimeError(f"ffprobe failed to get video dimensions. Error: {process.stderr}")
-        width, height = map(int, process.stdout.strip().split('x'))
+        width, height, duration = _probe_dimensions_and_duration(video_path)
+        # Input option: ffmpeg stops reading the source at max_duration, so every output stream ends at the same point.
+        # ffmpeg ignores -t for shorter inputs, so the duration does not need checking for that.
+        input_duration_options = ["-t", str(max_duration)] if max_duration else []
 
         if width == target_width and height == target_height:
-            print(f"Video is already {target_width}x{target_height}. No resize needed.")
-            if video_path != output_path:
-                 cp_process = subprocess.run(["cp", video_path, output_path], check=False, capture_output=True, text=True)
-                 if cp_process.returncode != 0:
-                     raise RuntimeError(f"Failed to copy video: {cp_process.stderr}")
+            if max_duration and (duration is None or duration > max_duration):
+                # Already the target size but too long: cut it without re-encoding.
+                logger.info("Video is already %sx%s. Cutting it to %s seconds without re-encoding.", target_width, target_height, max_duration)
+                cmd_cut = ["ffmpeg", *FFMPEG_QUIET_ARGS, *input_duration_options, "-i", video_path, "-c", "copy", output_path, "-y"]
+                cut_process = subprocess.run(cmd_cut, check=False, capture_output=True, text=True)
+                if cut_process.returncode != 0:
+                    raise RuntimeError(f"ffmpeg command failed while cutting the video. Error: {cut_process.stderr}")
+                return output_path
+            logger.info("Video is already %sx%s. No resize needed.", target_width, target_height)
+            if os.path.abspath(video_path) != os.path.abspath(output_path):
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                try:
+                    os.link(video_path, output_path) # Hard link: no bytes copied
+                except (OSError, NotImplementedError): # e.g. different filesystems
+                    shutil.copyfile(video_path, output_path)
             return output_path
 
-        # Get video duration
-        cmd_duration = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", video_path
-        ]
-        duration_process = subprocess.run(cmd_duration, capture_output=True, text=True, check=False)
-        if duration_process.returncode != 0:
-            raise RuntimeError(f"ffprobe failed to get video duration. Error: {duration_process.stderr}")
-        duration_str = duration_process.stdout.strip()
-        duration = float(duration_str)
-        output_options = []
-        if duration > 60: # if video is longer than 60s, then cut it to 60s
-            output_options = ["-t", "60"]
-
-        cmd_resize = [
-            "ffmpeg", "-i", video_path, "-vf",
-            f"scale=w={target_width}:h={target_height}:force_original_aspect_ratio=decrease,pad=w={target_width}:h={target_height}:x=(ow-iw)/2:y=(oh-ih)/2,setsar=1",
-            "-c:a", "copy", *output_options, output_path, "-y"
-        ]
-        print(f"Executing ffmpeg resize command: {' '.join(cmd_resize)}")
+        resize_filter = f"scale=w={target_width}:h={target_height}:force_original_aspect_ratio=decrease,pad=w={target_width}:h={target_height}:x=(ow-iw)/2:y=(oh-ih)/2,setsar=1"
+        logger.info("Resizing %sx%s -> %sx%s with filter: %s", width, height, target_width, target_height, resize_filter)
+
+        def build_resize_command(encoder_args):
+            return [
+                "ffmpeg", *FFMPEG_QUIET_ARGS, *_ffmpeg_hwaccel_args(), *input_duration_options, "-i", video_path,
+                "-vf", resize_filter, *encoder_args, "-c:a", "copy", output_path, "-y"
+            ]
+
+        cmd_resize = build_resize_command(get_video_encoder_args())
+        logger.debug("Executing ffmpeg resize command: %s", cmd_resize)
         resize_process = subprocess.run(cmd_resize, check=False, capture_output=True, text=True)
+        if resize_process.returncode != 0 and (is_nvenc_available() or _ffmpeg_hwaccel_args()):
+            # NVDEC/NVENC can be compiled in without a usable GPU/driver; remember that and retry on the CPU.
+            logger.warning("GPU decode/encode failed, falling back to the CPU. Error: %s", resize_process.stderr)
+            _disable_ffmpeg_gpu()
+            cmd_resize = build_resize_command(get_video_encoder_args())
+            resize_process = subprocess.run(cmd_resize, check=False, capture_output=True, text=True)
         if resize_process.returncode != 0:
             error_message = f"ffmpeg command failed during video resize. Error: {resize_process.stderr}"
-            print(error_message)
+            logger.error(error_message)
             raise RuntimeError(error_message)
-        print(f"Video resized successfully to {output_path}")
+        logger.info("Video resized successfully to %s", output_path)
     except Exception as e:
-        # Catch any other exception during the process (e.g., float conversion if duration_str is empty)
+        # Catch any other exception during the process (e.g., unparsable ffprobe output)
         error_message = f"An error occurred during video resizing: {str(e)}"
-        print(error_message)
+        logger.error(error_message)
         raise RuntimeError(error_message)
     return output_path
 
-def extract_audio(video_path, output_audio_path="audio.wav"):
+def _probe_frame_rate(video_path):
+    """Returns the frame rate of the first video stream as a float, using ffprobe."""
+    cmd_fps = [
+        "ffprobe", *FFPROBE_QUIET_ARGS, "-select_streams", "v:0",
+        "-show_entries", "stream=r_frame_rate", "-of", "default=noprint_wrappers=1:nokey=1", video_path
+    ]
+    process = subprocess.run(cmd_fps, capture_output=True, text=True, check=False)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe failed to get video frame rate. Error: {process.stderr}")
+    numerator, _, denominator = process.stdout.strip().partition("/")
+    return float(numerator) / float(denominator or 1)
+
+def _scale_and_pad_nv12(frame, target_width, target_height):
     """
-    Extracts audio from a video file using ffmpeg, resampling to 24kHz and 16-bit PCM.
-    This is optimized for Coqui XTTSv2 (24kHz) and generally good for Whisper/Wav2Lip.
+    Scales an NV12 frame (CUDA uint8 tensor of shape (H * 3 / 2, W)) to fit inside
+    target_width x target_height, keeping the aspect ratio, and pads it with black.
+    Mirrors the CPU filter "scale=...:force_original_aspect_ratio=decrease,pad=...".
     """
+    import torch
+    import torch.nn.functional as F
+
+    height = frame.shape[0] * 2 // 3
+    width = frame.shape[1]
+    scale = min(target_width / width, target_height / height)
+    # NV12 chroma is subsampled 2x2, so all sizes and offsets are kept even.
+    scaled_width = max(2, int(width * scale) // 2 * 2)
+    scaled_height = max(2, int(height * scale) // 2 * 2)
+    x_offset = (target_width - scaled_width) // 4 * 2
+    y_offset = (target_height - scaled_height) // 4 * 2
+
+    luma = frame[:height].float()[None, None]
+    chroma = frame[height:].view(height // 2, width // 2, 2).permute(2, 0, 1).float()[None]
+    luma = F.interpolate(luma, size=(scaled_height, scaled_width), mode="bilinear", align_corners=False)
+    chroma = F.interpolate(chroma, size=(scaled_height // 2, scaled_width // 2), mode="bilinear", align_corners=False)
+
+    # Limited-range black: Y=16, U=V=128.
+    out_luma = torch.full((target_height, target_width), 16, dtype=torch.uint8, device=frame.device)
+    out_chroma = torch.full((2, target_height // 2, target_width // 2), 128, dtype=torch.uint8, device=frame.device)
+    out_luma[y_offset:y_offset + scaled_height, x_offset:x_offset + scaled_width] = luma[0, 0].round().clamp(0, 255).to(torch.uint8)
+    out_chroma[:, y_offset // 2:(y_offset + scaled_height) // 2, x_offset // 2:(x_offset + scaled_width) // 2] = chroma[0].round().clamp(0, 255).to(torch.uint8)
+
+    out_chroma = out_chroma.permute(1, 2, 0).reshape(target_height // 2, target_width)
+    return torch.cat((out_luma, out_chroma), dim=0).contiguous()
+
+def resize_video_pynvc(video_path, output_path="resized_video.mp4", target_width=720, target_height=720, max_duration=60):
+    """
+    Resizes a video entirely on the GPU with PyNvVideoCodec: NVDEC decode -> CUDA scale/pad -> NVENC encode.
+    ffmpeg is only used to mux the original audio back in (stream copy).
+    Falls back to resize_video (ffmpeg) if PyNvVideoCodec is not installed or the GPU path fails.
+    """
+    if nvc is None:
+        return resize_video(video_path, output_path, target_width, target_height, max_duration)
+
+    elementary_stream_path = f"{os.path.splitext(output_path)[0]}.h264"
+    try:
+        fps = _probe_frame_rate(video_path)
+        max_frames = int(round(max_duration * fps)) if max_duration else None
+
+        demuxer = nvc.CreateDemuxer(filename=video_path)
+        decoder = nvc.CreateDecoder(gpuid=0, codec=demuxer.GetNvCodecId(), cudacontext=0, cudastream=0, usedevicememory=True)
+        encoder = nvc.CreateEncoder(target_width, target_height, "NV12", False, codec="h264", preset="P4")
+
+        import torch
+        frame_count = 0
+        logger.info("Resizing %s with PyNvVideoCodec to %sx%s...", video_path, target_width, target_height)
+        with open(elementary_stream_path, "wb") as bitstream_file:
+            for packet in demuxer:
+                for decoded_frame in decoder.Decode(packet):
+                    if max_frames is not None and frame_count >= max_frames:
+                        break
+                    resized = _scale_and_pad_nv12(torch.from_dlpack(decoded_frame), target_width, target_height)
+                    bitstream_file.write(bytearray(encoder.Encode(resized)))
+                    frame_count += 1
+                if max_frames is not None and frame_count >= max_frames:
+                    break
+            bitstream_file.write(bytearray(encoder.EndEncode()))
+
+        # Mux the raw H.264 stream with the original audio (both stream-copied).
+        cmd_mux = [
+            "ffmpeg", *FFMPEG_QUIET_ARGS, "-framerate", f"{fps}", "-i", elementary_stream_path, "-i", video_path,
+            "-map", "0:v", "-map", "1:a?", "-c:v", "copy", "-c:a", "copy",
+            *(["-t", str(max_duration)] if max_duration else []), output_path, "-y"
+        ]
+        logger.debug("Executing ffmpeg mux command: %s", cmd_mux)
+        mux_process = subprocess.run(cmd_mux, check=False, capture_output=True, text=True)
+        if mux_process.returncode != 0:
+            raise RuntimeError(f"ffmpeg command failed while muxing the resized video. Error: {mux_process.stderr}")
+        logger.info("Video resized successfully to %s (%s frames on the GPU)", output_path, frame_count)
+        return output_path
+    except Exception as e:
+        logger.warning("PyNvVideoCodec resize failed (%s), falling back to ffmpeg.", e)
+        return resize_video(video_path, output_path, target_width, target_height, max_duration)
+    finally:
+        if os.path.exists(elementary_stream_path):
+            os.remove(elementary_stream_path)
+
+def extract_audio(video_path, output_audio_path="audio.wav", max_duration=None, sample_rate=TRANSCRIPTION_SAMPLE_RATE):
+    """
+    Extracts audio from a video file using ffmpeg, resampling to mono 16-bit PCM at sample_rate.
+    The default 16kHz is the native input rate of Whisper and Wav2Lip; extract the XTTS speaker reference
+    at SPEAKER_REFERENCE_SAMPLE_RATE instead, since 16kHz audio carries nothing above 8kHz.
+    If max_duration (seconds) is given, only the first max_duration seconds are extracted,
+    matching the cut applied by resize_video so the audio can be taken from the original file.
+    """
+    duration_options = ["-t", str(max_duration)] if max_duration else []
     command = [
-        "ffmpeg", "-i", video_path,
+        "ffmpeg", *FFMPEG_QUIET_ARGS, *duration_options, "-i", video_path,
         "-vn",  # No video output
         "-acodec", "pcm_s16le",  # Audio codec: PCM signed 16-bit little-endian
-        "-ar", "24000",  # Audio sample rate: 24kHz
+        "-ar", str(sample_rate),  # Audio sample rate (16kHz by default)
         "-ac", "1",  # Audio channels: 1 (mono)
         # "-q:a", "0", # Highest quality for the chosen codec - often implicit for PCM
         output_audio_path,
         "-y"  # Overwrite output file if it exists
     ]
-    print(f"Executing ffmpeg audio extract command: {' '.join(command)}")
+    logger.debug("Executing ffmpeg audio extract command: %s", command)
     try:
         extract_process = subprocess.run(command, check=False, capture_output=True, text=True)
         if extract_process.returncode != 0:
             error_message = f"ffmpeg command failed during audio extraction. Error: {extract_process.stderr}"
-            print(error_message)
+            logger.error(error_message)
             raise RuntimeError(error_message)
-        print(f"Audio extracted successfully to {output_audio_path}")
+        logger.info("Audio extracted successfully to %s", output_audio_path)
     except subprocess.CalledProcessError as e: # Should be caught by check=False and returncode check, but as fallback
         error_message = f"ffmpeg command failed during audio extraction (CalledProcessError). Error: {e.stderr}"
-        print(error_message)
+        logger.error(error_message)
         raise RuntimeError(error_message)
     except Exception as e:
         error_message = f"An unexpected error occurred during audio extraction: {str(e)}"
-        print(error_message)
+        logger.error(error_message)
         raise RuntimeError(error_message)
     return output_audio_path
+
+def extract_audio_inmemory(video_path, max_duration=None):
+    """
+    Decodes the audio track of a video straight into memory as 16kHz mono float32 samples (Whisper's input
+    format), without writing a WAV file. ffmpeg writes raw samples to stdout.
+
+    Returns:
+        numpy.ndarray: 1-D float32 samples in [-1, 1].
+    """
+    import numpy as np
+    duration_options = ["-t", str(max_duration)] if max_duration else []
+    command = [
+        "ffmpeg", *FFMPEG_QUIET_ARGS, *duration_options, "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(TRANSCRIPTION_SAMPLE_RATE), "-f", "f32le", "pipe:1",
+    ]
+    logger.debug("Executing ffmpeg in-memory audio extract command: %s", command)
+    extract_process = subprocess.run(command, check=False, capture_output=True)
+    if extract_process.returncode != 0:
+        error_message = f"ffmpeg command failed during in-memory audio extraction. Error: {extract_process.stderr.decode(errors='replace')}"
+        logger.error(error_message)
+        raise RuntimeError(error_message)
+    return np.frombuffer(extract_process.stdout, dtype=np.float32)
+
+def _extract_audio_outputs(video_path, audio_output_path, speaker_output_path, max_duration):
+    """Runs extract_audio for the 16kHz audio and the speaker reference, skipping a None path. Returns both paths."""
+    audio_path = extract_audio(video_path, audio_output_path, max_duration) if audio_output_path else None
+    speaker_path = extract_audio(video_path, speaker_output_path, max_duration, SPEAKER_REFERENCE_SAMPLE_RATE) if speaker_output_path else None
+    return audio_path, speaker_path
+
+def resize_and_extract(video_path, resized_output_path, audio_output_path, speaker_output_path=None, target_width=720, target_height=720, max_duration=60):
+    """
+    Resizes a video (like resize_video) and extracts its audio (like extract_audio) from a single decode of the input:
+    16kHz audio for transcription at audio_output_path and, optionally, a speaker reference for voice cloning
+    at SPEAKER_REFERENCE_SAMPLE_RATE at speaker_output_path. Any output path may be None to skip that output.
+    If max_duration is given, all outputs are cut to the first max_duration seconds.
+
+    With PyNvVideoCodec the video is resized on the GPU while the audio is extracted concurrently;
+    otherwise a single ffmpeg process writes all outputs.
+
+    Returns:
+        tuple: (resized_video_path, audio_path, speaker_reference_path), with None for a skipped output.
+    """
+    if resized_output_path is None:
+        if audio_output_path is None and speaker_output_path is None:
+            return None, None, None
+        return (None, *_extract_audio_outputs(video_path, audio_output_path, speaker_output_path, max_duration))
+    if audio_output_path is None and speaker_output_path is None:
+        return resize_video_pynvc(video_path, resized_output_path, target_width, target_height, max_duration), None, None
+    if nvc is not None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            audio_future = executor.submit(_extract_audio_outputs, video_path, audio_output_path, speaker_output_path, max_duration)
+            resized_path = resize_video_pynvc(video_path, resized_output_path, target_width, target_height, max_duration)
+            return (resized_path, *audio_future.result())
+
+    try:
+        width, height, _ = _probe_dimensions_and_duration(video_path)
+        # Input option (see resize_video): both outputs, including a stream-copied video, end at the same point.
+        input_duration_options = ["-t", str(max_duration)] if max_duration else []
+
+        audio_outputs = []
+        if audio_output_path:
+            # 16kHz mono 16-bit PCM audio for transcription (see extract_audio)
+            audio_outputs += ["-map", "0:a:0", "-vn", "-acodec", "pcm_s16le", "-ar", str(TRANSCRIPTION_SAMPLE_RATE), "-ac", "1", audio_output_path]
+        if speaker_output_path:
+            # The same at the speaker reference rate, for voice cloning
+            audio_outputs += ["-map", "0:a:0", "-vn", "-acodec", "pcm_s16le", "-ar", str(SPEAKER_REFERENCE_SAMPLE_RATE), "-ac", "1", speaker_output_path]
+
+        def build_command(encoder_args):
+            if width == target_width and height == target_height:
+                video_options = ["-c:v", "copy"] # Already the target size; no re-encode needed
+            else:
+                video_options = [
+                    "-vf", f"scale=w={target_width}:h={target_height}:force_original_aspect_ratio=decrease,pad=w={target_width}:h={target_height}:x=(ow-iw)/2:y=(oh-ih)/2,setsar=1",
+                    *encoder_args,
+                ]
+            return [
+                "ffmpeg", *FFMPEG_QUIET_ARGS, "-y", *_ffmpeg_hwaccel_args(), *input_duration_options, "-i", video_path,
+                # Output 1: the resized video with the original audio stream
+                "-map", "0:v:0", "-map", "0:a?", *video_options, "-c:a", "copy", resized_output_path,
+                # Further outputs: the extracted audio
+                *audio_outputs,
+            ]
+
+        command = build_command(get_video_encoder_args())
+        logger.debug("Executing ffmpeg resize + audio extract command: %s", command)
+        fused_process = subprocess.run(command, check=False, capture_output=True, text=True)
+        if fused_process.returncode != 0 and (is_nvenc_available() or _ffmpeg_hwaccel_args()):
+            # Same fallback as resize_video: NVDEC/NVENC can be compiled in without a usable GPU/driver.
+            logger.warning("GPU decode/encode failed, falling back to the CPU. Error: %s", fused_process.stderr)
+            _disable_ffmpeg_gpu()
+            command = build_command(get_video_encoder_args())
+            fused_process = subprocess.run(command, check=False, capture_output=True, text=True)
+        if fused_process.returncode != 0:
+            raise RuntimeError(f"ffmpeg command failed during video resize and audio extraction. Error: {fused_process.stderr}")
+        logger.info("Video resized to %s and audio extracted to %s / %s", resized_output_path, audio_output_path, speaker_output_path)
+    except Exception as e:
+        error_message = f"An error occurred during video resizing and audio extraction: {str(e)}"
+        logger.error(error_message)
+        raise RuntimeError(error_message)
+    return resized_output_path, audio_output_path, speaker_output_path
@@ -0,0 +1,77 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src import artifact_cache
+from src.artifact_cache import artifact_key, cache_file, cache_value, get_cached_file, get_cached_value
+
+diskcache = pytest.importorskip("diskcache")
+
+@pytest.fixture
+def temp_artifact_cache(tmp_path):
+    """An artifact cache in a temporary directory for each test."""
+    cache = diskcache.Cache(str(tmp_path / "cache"))
+    with patch.object(artifact_cache, "artifact_cache_instance", cache):
+        yield cache
+    cache.close()
+
+def test_artifact_key_chaining():
+    """Test that keys are stable and that a changed input changes every key derived from it."""
+    video_key = artifact_key("download", "https://youtu.be/dQw4w9WgXcQ")
+    audio_key = artifact_key("extract_audio", video_key)
+
+    assert artifact_key("download", "https://youtu.be/dQw4w9WgXcQ") == video_key
+    assert artifact_key("extract_audio", video_key) == audio_key
+
+    other_video_key = artifact_key("download", "https://youtu.be/otherVideo1")
+    assert other_video_key != video_key
+    assert artifact_key("extract_audio", other_video_key) != audio_key
+    assert artifact_key("a", "b") != artifact_key("ab") # Parts are separated, not concatenated
+
+def test_cached_value_hit_and_miss(temp_artifact_cache):
+    """Test that a stored value is returned for its key and None for an unknown key."""
+    key = artifact_key("transcribe", "audio")
+    assert get_cached_value(key) is None
+
+    cache_value(key, {"text": "Hello world"})
+
+    assert get_cached_value(key) == {"text": "Hello world"}
+    assert get_cached_value(artifact_key("transcribe", "other audio")) is None
+
+def test_cached_file_hit_and_miss(temp_artifact_cache, tmp_path):
+    """Test that a stored file is placed at the output path on a hit, and nothing is written on a miss."""
+    source_path = tmp_path / "video.mp4"
+    source_path.write_bytes(b"video data")
+    key = artifact_key("resize", "video")
+    output_path = str(tmp_path / "output.mp4")
+
+    assert get_cached_file(key, output_path) is None
+    assert not os.path.exists(output_path)
+
+    cache_file(key, str(source_path))
+
+    assert get_cached_file(key, output_path) == output_path
+    with open(output_path, "rb") as f:
+        assert f.read() == b"video data"
+
+def test_cached_file_copy_fallback(temp_artifact_cache, tmp_path):
+    """Test that the cached file is copied when it cannot be hard linked."""
+    source_path = tmp_path / "video.mp4"
+    source_path.write_bytes(b"video data" * 1000)
+    key = artifact_key("resize", "video")
+    cache_file(key, str(source_path))
+    output_path = tmp_path / "output.mp4"
+    output_path.write_bytes(b"stale") # An existing output is replaced
+
+    with patch.object(os, "link", side_effect=OSError("Invalid cross-device link")) as mock_link:
+        assert get_cached_file(key, str(output_path)) == str(output_path)
+
+    mock_link.assert_called_once()
+    assert output_path.read_bytes() == b"video data" * 1000
+
+def test_cache_read_errors_are_misses(temp_artifact_cache, tmp_path):
+    """Test that errors reading the cache are logged and treated as misses."""
+    with patch.object(temp_artifact_cache, "get", side_effect=OSError("database disk image is malformed")):
+        assert get_cached_value("key") is None
+        assert get_cached_file("key", str(tmp_path / "output.mp4")) is None
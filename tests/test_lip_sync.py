@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from src import lip_sync
+from src.lip_sync import FACE_DETECTION_STRIDE
+
+FRAME_SIZE = 64
+
+def make_face_detect_module(detected_frames):
+    """
+    A stand-in for Wav2Lip's inference module. Each frame is filled with its index; the fake detector
+    records the frames it is run on and returns a box starting at (index, index) for each of them.
+    """
+    class FakeDetector:
+        def get_detections_for_batch(self, batch):
+            boxes = []
+            for image in batch:
+                index = int(image[0, 0, 0])
+                detected_frames.append(index)
+                boxes.append((index, index, index + 10, index + 10))
+            return boxes
+
+    return SimpleNamespace(
+        args=SimpleNamespace(face_det_batch_size=4, pads=(0, 0, 0, 0), nosmooth=True),
+        face_detection=SimpleNamespace(
+            FaceAlignment=lambda *args, **kwargs: FakeDetector(),
+            LandmarksType=SimpleNamespace(_2D=None),
+        ),
+        device="cpu",
+        tqdm=lambda iterable: iterable,
+    )
+
+def make_frames(frame_count):
+    return [np.full((FRAME_SIZE, FRAME_SIZE, 3), index, dtype=np.uint8) for index in range(frame_count)]
+
+@pytest.mark.parametrize("frame_count", [1, FACE_DETECTION_STRIDE, 2 * FACE_DETECTION_STRIDE + 2])
+def test_sampled_face_detect(frame_count):
+    """Test that every frame gets a box and that the stride frames and the last frame are detected."""
+    detected_frames = []
+    module = make_face_detect_module(detected_frames)
+
+    results = lip_sync._sampled_face_detect(module, make_frames(frame_count))
+
+    assert len(results) == frame_count
+    # Every stride-th frame and the last frame are detected; the last one is never extrapolated.
+    assert detected_frames == sorted(set(range(0, frame_count, FACE_DETECTION_STRIDE)) | {frame_count - 1})
+    for index, (face, coords) in enumerate(results):
+        # Boxes move linearly with the frame index, so interpolated boxes equal detected ones.
+        assert coords == (index, index + 10, index, index + 10)
+        assert face.shape[:2] == (10, 10)
+
+def test_sampled_face_detect_no_frames():
+    """Test that empty input returns no boxes without running the detector."""
+    detected_frames = []
+    assert lip_sync._sampled_face_detect(make_face_detect_module(detected_frames), []) == []
+    assert detected_frames == []
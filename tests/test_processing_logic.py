@@ -1,94 +1,217 @@
-import unittest
-from unittest.mock import patch, MagicMock
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import googletrans
+import pytest
 
 # Import functions/variables to be tested
-from src.utils import language_mapping, is_valid_youtube_link # Import the moved function
-from src.translation import translate_text
+from src.utils import language_mapping, is_valid_youtube_link, is_valid_youtube_link_batch # Import the moved function
+from src import translation
+from src.translation import TranslationError, translate_if_needed, translate_text, translate_text_async
 # We will mock googletrans.Translator
 
-class TestProcessingLogic(unittest.TestCase):
-
-    def test_language_mapping(self):
-        """Test that a known language maps to the correct code."""
-        self.assertEqual(language_mapping.get("en"), "english")
-        self.assertEqual(language_mapping.get("es"), "spanish")
-        self.assertIsNone(language_mapping.get("xx")) # Non-existent key
-
-    def test_youtube_link_validation(self):
-        """Test the YouTube link regex validation."""
-        valid_links = [
-            "http://youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://youtube.com/watch?v=dQw4w9WgXcQ",
-            "http://www.youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-            "http://youtu.be/dQw4w9WgXcQ",
-            "https://youtu.be/dQw4w9WgXcQ",
-            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=60s" # With parameters
-        ]
-        invalid_links = [
-            "http://youtube.com/watch?v=",
-            "http://youtube.com/watch",
-            "ftp://youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://example.com/watch?v=dQw4w9WgXcQ",
-            "https://www.youtube.com/playlist?list=PL_12345"
-        ]
-
-        for link in valid_links:
-            self.assertTrue(is_valid_youtube_link(link), f"Expected '{link}' to be valid.")
-        
-        for link in invalid_links:
-            self.assertFalse(is_valid_youtube_link(link), f"Expected '{link}' to be invalid.")
-
-    @patch('src.translation.Translator')
-    def test_translate_text_same_language(self, MockTranslator):
-        """Test translate_text when source and target languages are the same."""
-        # MockTranslator instance is not used as the function should return early
-        src_text = "Hello world"
-        translated = translate_text(src_text, "en", "en")
-        self.assertEqual(translated, src_text)
-        MockTranslator.assert_not_called() # Translator should not be initialized or used
-
-    @patch('src.translation.Translator')
-    def test_translate_text_different_language(self, MockTranslator):
-        """Test translate_text when source and target languages are different."""
-        mock_translator_instance = MockTranslator.return_value
-        mock_translation_result = MagicMock()
-        mock_translation_result.text = "Hola mundo"
-        mock_translator_instance.translate.return_value = mock_translation_result
-
-        src_text = "Hello world"
-        src_lang = "en"
-        target_lang = "es"
-        
-        translated = translate_text(src_text, src_lang, target_lang)
-        
-        self.assertEqual(translated, "Hola mundo")
-        MockTranslator.assert_called_once() # Ensure Translator was initialized
-        mock_translator_instance.translate.assert_called_once_with(src_text, src=src_lang, dest=target_lang)
-
-    @patch('src.translation.Translator')
-    def test_translate_text_empty_input(self, MockTranslator):
-        """Test translate_text with empty input text."""
-        with self.assertRaises(RuntimeError) as context: # Assuming it raises RuntimeError for empty text after changes
-            translate_text("", "en", "es")
-        self.assertIn("No text provided for translation", str(context.exception)) #Check if the error message is as expected
-        MockTranslator.assert_not_called()
-
-    @patch('src.translation.Translator')
-    def test_translate_text_translation_failure(self, MockTranslator):
-        """Test translate_text when the underlying translate call fails."""
-        mock_translator_instance = MockTranslator.return_value
-        mock_translator_instance.translate.side_effect = Exception("Simulated API error")
-
-        src_text = "Hello world"
-        with self.assertRaises(RuntimeError) as context:
-            translate_text(src_text, "en", "es")
-        
-        self.assertIn("Error during translation", str(context.exception))
-        self.assertIn("Simulated API error", str(context.exception))
-        MockTranslator.assert_called_once()
-        mock_translator_instance.translate.assert_called_once_with(src_text, src="en", dest="es")
-
-
-if __name__ == '__main__':
-    unittest.main()
+VALID_YOUTUBE_LINKS = (
+    "http://youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ",
+    "http://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "http://youtu.be/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=60s", # With parameters
+)
+INVALID_YOUTUBE_LINKS = (
+    "http://youtube.com/watch?v=",
+    "http://youtube.com/watch",
+    "ftp://youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://example.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/playlist?list=PL_12345",
+    "https://youtu.be/dQw4w9WgXcQdQw4w9WgXcQdQw4w9WgXcQ", # Id far longer than a video id
+)
+
+@pytest.fixture
+def mock_translator():
+    """A fresh autospec'd googletrans.Translator mock for each test."""
+    # translate_text shares one Translator and memoizes results across calls; start and end each test clean.
+    translation._translator = None
+    translation.clear_translation_cache()
+    # src.translation imports googletrans.Translator lazily when it creates the shared Translator.
+    with patch.object(googletrans, "Translator", autospec=True) as mock_translator_class:
+        yield mock_translator_class
+    translation._translator = None
+    translation.clear_translation_cache()
+
+def test_language_mapping():
+    """Test that a known language maps to the correct code."""
+    assert language_mapping.get("en") == "english"
+    assert language_mapping.get("es") == "spanish"
+    assert language_mapping.get("xx") is None # Non-existent key
+
+@pytest.mark.parametrize("link", VALID_YOUTUBE_LINKS)
+def test_youtube_link_validation_valid(link):
+    """Test that well-formed YouTube links are accepted."""
+    assert is_valid_youtube_link(link)
+
+@pytest.mark.parametrize("link", INVALID_YOUTUBE_LINKS)
+def test_youtube_link_validation_invalid(link):
+    """Test that malformed or non-video YouTube links are rejected."""
+    assert not is_valid_youtube_link(link)
+
+def test_youtube_link_validation_batch():
+    """Test that batch validation agrees with validating each link on its own."""
+    links = VALID_YOUTUBE_LINKS + INVALID_YOUTUBE_LINKS + (
+        "",
+        "https://youtu.be/dQw4w9WgXcQ?si=abc",
+        # Non-ASCII and control whitespace that RE2's \s does not cover
+        "https://youtu.be/abc?t=1\x0b2",
+        "https://youtu.be/abc?t=1\u00a02",
+        "https://youtu.be/abc?t=1\u30002",
+    )
+    assert is_valid_youtube_link_batch(links) == [is_valid_youtube_link(link) for link in links]
+
+def test_translate_text_same_language(mock_translator):
+    """Test translate_text when source and target languages are the same."""
+    # The mock Translator is not used as the function should return early
+    src_text = "Hello world"
+    translated = translate_text(src_text, "en", "en")
+    assert translated == src_text
+    mock_translator.assert_not_called() # Translator should not be initialized or used
+
+def test_translate_if_needed_fastpath():
+    """Test that translate_if_needed returns same-language text without calling translate_text."""
+    with patch.object(translation, "translate_text") as mock_translate_text:
+        assert translate_if_needed("Hello world", "en", "en") == "Hello world"
+        mock_translate_text.assert_not_called()
+
+        translate_if_needed("Hello world", "en", "es")
+        mock_translate_text.assert_called_once_with("Hello world", "en", "es")
+
+def test_translate_text_different_language(mock_translator):
+    """Test translate_text when source and target languages are different."""
+    mock_translator_instance = mock_translator.return_value
+    mock_translation_result = SimpleNamespace(text="Hola mundo")
+    mock_translator_instance.translate.return_value = mock_translation_result
+
+    src_text = "Hello world"
+    src_lang = "en"
+    target_lang = "es"
+
+    translated = translate_text(src_text, src_lang, target_lang)
+
+    assert translated == "Hola mundo"
+    mock_translator.assert_called_once() # Ensure Translator was initialized
+    mock_translator_instance.translate.assert_called_once_with(src_text, src=src_lang, dest=target_lang)
+
+def test_translate_text_multiple_sentences(mock_translator):
+    """Test that translate_text translates each sentence and joins the results in order."""
+    mock_translator_instance = mock_translator.return_value
+    translations = {"Hello world.": "Hola mundo.", "How are you?": "¿Cómo estás?"}
+    mock_translator_instance.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=translations[text])
+
+    translated = translate_text("Hello world. How are you?", "en", "es")
+
+    assert translated == "Hola mundo. ¿Cómo estás?"
+    assert mock_translator_instance.translate.call_count == 2
+
+def test_translate_text_keeps_sentence_separators(mock_translator):
+    """Test that line breaks between sentences are kept and other separators follow the target language."""
+    mock_translator_instance = mock_translator.return_value
+    translations = {
+        ("Hello world.", "ja"): "こんにちは世界。", ("How are you?", "ja"): "お元気ですか？",
+        ("Hello world.", "es"): "Hola mundo.", ("How are you?", "es"): "¿Cómo estás?",
+        ("こんにちは世界。", "en"): "Hello world.", ("お元気ですか？", "en"): "How are you?",
+    }
+    mock_translator_instance.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=translations[text, dest])
+
+    assert translate_text("Hello world. How are you?", "en", "ja") == "こんにちは世界。お元気ですか？"
+    assert translate_text("Hello world.\n\nHow are you?", "en", "es") == "Hola mundo.\n\n¿Cómo estás?"
+    assert translate_text("こんにちは世界。お元気ですか？", "ja", "en") == "Hello world. How are you?"
+    assert asyncio.run(translate_text_async("Hello world.\nHow are you?", "en", "ja")) == "こんにちは世界。\nお元気ですか？"
+
+def test_translate_text_async_multiple_sentences(mock_translator):
+    """Test that translate_text_async translates all sentences and joins the results in order."""
+    mock_translator_instance = mock_translator.return_value
+    translations = {"Hello world.": "Hola mundo.", "How are you?": "¿Cómo estás?"}
+    mock_translator_instance.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=translations[text])
+
+    translated = asyncio.run(translate_text_async("Hello world. How are you?", "en", "es"))
+
+    assert translated == "Hola mundo. ¿Cómo estás?"
+    assert mock_translator_instance.translate.call_count == 2
+
+def test_translate_text_reuses_translator_and_results(mock_translator):
+    """Test that repeated translations share one Translator and repeated text is served from the cache."""
+    mock_translator_instance = mock_translator.return_value
+    mock_translator_instance.translate.return_value = SimpleNamespace(text="Hola mundo")
+
+    assert translate_text("Hello world", "en", "es") == "Hola mundo"
+    assert translate_text("Hello world", "en", "es") == "Hola mundo"
+
+    mock_translator.assert_called_once()
+    mock_translator_instance.translate.assert_called_once_with("Hello world", src="en", dest="es")
+
+def test_translate_text_repeated_sentences(mock_translator):
+    """Test that a sentence repeated within one text is only requested once."""
+    mock_translator_instance = mock_translator.return_value
+    mock_translator_instance.translate.return_value = SimpleNamespace(text="Hola.")
+
+    translated = translate_text("Hello. Hello. Hello.", "en", "es")
+
+    assert translated == "Hola. Hola. Hola."
+    mock_translator_instance.translate.assert_called_once_with("Hello.", src="en", dest="es")
+
+def test_translate_text_batch(mock_translator):
+    """Test that a list of texts is translated in one batch and returned in input order."""
+    mock_translator_instance = mock_translator.return_value
+    translations = {"Hello world.": "Hola mundo.", "How are you?": "¿Cómo estás?", "Goodbye": "Adiós"}
+    mock_translator_instance.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=translations[text])
+
+    translated = translate_text(["Hello world. How are you?", "", "Goodbye", "Hello world."], "en", "es")
+
+    assert translated == ["Hola mundo. ¿Cómo estás?", "", "Adiós", "Hola mundo."]
+    mock_translator.assert_called_once()
+    assert mock_translator_instance.translate.call_count == 3 # "Hello world." is requested once
+
+def test_translate_text_async_batch(mock_translator):
+    """Test that translate_text_async accepts a list of texts like translate_text and returns a list."""
+    mock_translator_instance = mock_translator.return_value
+    translations = {"Hello world.": "Hola mundo.", "How are you?": "¿Cómo estás?", "Goodbye": "Adiós"}
+    mock_translator_instance.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=translations[text])
+
+    translated = asyncio.run(translate_text_async(["Hello world. How are you?", "", "Goodbye", "Hello world."], "en", "es"))
+
+    assert translated == ["Hola mundo. ¿Cómo estás?", "", "Adiós", "Hola mundo."]
+    assert mock_translator_instance.translate.call_count == 3 # "Hello world." is requested once
+    assert asyncio.run(translate_text_async(["Hello", "world"], "en", "en")) == ["Hello", "world"]
+
+def test_translate_text_async_shares_translator(mock_translator):
+    """Test that concurrent async translations and sync translations all use one Translator."""
+    mock_translator.return_value.translate.side_effect = lambda text, src, dest: SimpleNamespace(text=text.upper())
+
+    async def translate_concurrently():
+        return await asyncio.gather(*(translate_text_async(f"Text {i}. More {i}.", "en", "es") for i in range(4)))
+
+    asyncio.run(translate_concurrently())
+    translate_text("Hello world", "en", "es")
+
+    mock_translator.assert_called_once()
+
+def test_translate_text_empty_input(mock_translator):
+    """Test translate_text with empty input text."""
+    with pytest.raises(RuntimeError, match="No text provided for translation"):
+        translate_text("", "en", "es")
+    mock_translator.assert_not_called()
+
+def test_translate_text_translation_failure(mock_translator):
+    """Test translate_text when the underlying translate call fails."""
+    mock_translator_instance = mock_translator.return_value
+    mock_translator_instance.translate.side_effect = Exception("Simulated API error")
+
+    src_text = "Hello world"
+    with pytest.raises(TranslationError) as excinfo:
+        translate_text(src_text, "en", "es")
+
+    assert isinstance(excinfo.value, RuntimeError) # Callers catching RuntimeError still work
+    assert excinfo.value.__cause__.args[0] == "Simulated API error"
+    mock_translator.assert_called_once()
+    mock_translator_instance.translate.assert_called_once_with(src_text, src="en", dest="es")